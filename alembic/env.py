@@ -47,6 +47,14 @@ if config.config_file_name is not None:
 target_metadata = core.Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Индексы по выражениям SQLite не отражает: без фильтра autogenerate
+    # при каждом запуске предлагал бы создать их заново
+    if type_ == 'index' and not reflected:
+        return len(object.columns) == len(object.expressions)
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -69,6 +77,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -81,6 +90,7 @@ def do_run_migrations(connection):
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_object=include_object,
         # Допишите ещё один параметр.
         render_as_batch=True)
 
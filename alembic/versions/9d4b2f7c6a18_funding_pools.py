@@ -0,0 +1,192 @@
+"""Funding pools
+
+Revision ID: 9d4b2f7c6a18
+Revises: e3a1c8f4b702
+Create Date: 2026-10-18 16:07:43.512094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2f7c6a18'
+down_revision = 'e3a1c8f4b702'
+branch_labels = None
+depends_on = None
+
+QUEUES = ('charityproject', 'donation')
+
+REST = (
+    'CASE WHEN {row}.close_date IS NULL '
+    'THEN COALESCE({row}.full_amount, 0) '
+    '- COALESCE({row}.invested_amount, 0) '
+    'ELSE 0 END'
+)
+
+POOL = "COALESCE({row}.pool, '')"
+
+ENSURE_POOL = (
+    'INSERT OR IGNORE INTO queuetotal (queue, pool, amount) VALUES {values}; '
+)
+
+TRIGGERS = (
+    'CREATE TRIGGER {queue}_total_insert AFTER INSERT ON {queue} BEGIN '
+    '{ensure_pool}UPDATE queuetotal SET amount = amount + {new_rest} '
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    'CREATE TRIGGER {queue}_total_update AFTER UPDATE OF '
+    'full_amount, invested_amount, close_date ON {queue} '
+    'WHEN OLD.pool IS NEW.pool '
+    'BEGIN UPDATE queuetotal SET amount = amount + {new_rest} - {old_rest} '
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    'CREATE TRIGGER {queue}_total_move AFTER UPDATE ON {queue} '
+    'WHEN OLD.pool IS NOT NEW.pool BEGIN '
+    '{ensure_pool}UPDATE queuetotal SET amount = amount - {old_rest} '
+    "WHERE queue = '{queue}' AND pool = {old_pool}; "
+    'UPDATE queuetotal SET amount = amount + {new_rest} '
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    'CREATE TRIGGER {queue}_total_delete AFTER DELETE ON {queue} '
+    'BEGIN UPDATE queuetotal SET amount = amount - {old_rest} '
+    "WHERE queue = '{queue}' AND pool = {old_pool}; END",
+)
+
+POOLS = ' UNION '.join(
+    f'SELECT {POOL.format(row=queue)} AS pool FROM {queue}'
+    for queue in QUEUES
+)
+
+# Итоги и триггеры ревизии c27e5f0a9d13 - для отката
+OLD_TRIGGERS = (
+    'CREATE TRIGGER {queue}_total_insert AFTER INSERT ON {queue} '
+    'BEGIN UPDATE queuetotal SET amount = amount + {new_rest} '
+    "WHERE queue = '{queue}'; END",
+    'CREATE TRIGGER {queue}_total_update AFTER UPDATE OF '
+    'full_amount, invested_amount, close_date ON {queue} '
+    'BEGIN UPDATE queuetotal SET amount = amount + {new_rest} - {old_rest} '
+    "WHERE queue = '{queue}'; END",
+    'CREATE TRIGGER {queue}_total_delete AFTER DELETE ON {queue} '
+    'BEGIN UPDATE queuetotal SET amount = amount - {old_rest} '
+    "WHERE queue = '{queue}'; END",
+)
+
+OPEN = sa.text('close_date IS NULL')
+
+
+def queue_total_ddl(queue):
+    new_pool = POOL.format(row='NEW')
+    ensure_pool = ENSURE_POOL.format(
+        values=', '.join(f"('{name}', {new_pool}, 0)" for name in QUEUES)
+    )
+    return [
+        'INSERT INTO queuetotal (queue, pool, amount) '
+        f"SELECT '{queue}', pools.pool, COALESCE(("
+        f'SELECT SUM({REST.format(row=queue)}) FROM {queue} '
+        f'WHERE {POOL.format(row=queue)} = pools.pool), 0) '
+        f'FROM ({POOLS}) AS pools',
+        *(
+            trigger.format(
+                queue=queue,
+                new_rest=REST.format(row='NEW'),
+                old_rest=REST.format(row='OLD'),
+                new_pool=new_pool,
+                old_pool=POOL.format(row='OLD'),
+                ensure_pool=ensure_pool,
+            )
+            for trigger in TRIGGERS
+        ),
+    ]
+
+
+def old_queue_total_ddl(queue):
+    return [
+        'INSERT INTO queuetotal (queue, amount) '
+        f"SELECT '{queue}', COALESCE(SUM({REST.format(row=queue)}), 0) "
+        f'FROM {queue}',
+        *(
+            trigger.format(
+                queue=queue,
+                new_rest=REST.format(row='NEW'),
+                old_rest=REST.format(row='OLD'),
+            )
+            for trigger in OLD_TRIGGERS
+        ),
+    ]
+
+
+def drop_triggers():
+    for queue in QUEUES:
+        for action in ('insert', 'update', 'move', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS {queue}_total_{action}')
+
+
+def create_queue_indexes(batch_op, table, pool):
+    """Индексы очередей распределения; при pool - с пулом в начале ключа."""
+    prefix = ['pool'] if pool else []
+    batch_op.create_index(f'ix_{table}_open_queue', [*prefix, 'create_date', 'id', 'full_amount', 'invested_amount', 'version', 'close_date'], unique=False, sqlite_where=OPEN, postgresql_where=OPEN)
+    if table != 'charityproject':
+        return
+    batch_op.create_index('ix_charityproject_closest_queue', [*prefix, sa.text('(full_amount - invested_amount)'), 'create_date', 'id', 'full_amount', 'invested_amount', 'version', 'close_date'], unique=False, sqlite_where=OPEN, postgresql_where=OPEN)
+    batch_op.create_index('ix_charityproject_priority_queue', [*prefix, sa.text('(-priority)'), 'create_date', 'id', 'full_amount', 'invested_amount', 'version', 'priority', 'close_date'], unique=False, sqlite_where=OPEN, postgresql_where=OPEN)
+
+
+def drop_queue_indexes(batch_op, table):
+    batch_op.drop_index(f'ix_{table}_open_queue')
+    if table == 'charityproject':
+        batch_op.drop_index('ix_charityproject_closest_queue')
+        batch_op.drop_index('ix_charityproject_priority_queue')
+
+
+def upgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        drop_triggers()
+    for table in QUEUES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('pool', sa.String(length=100), nullable=True))
+            drop_queue_indexes(batch_op, table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            create_queue_indexes(batch_op, table, pool=True)
+            batch_op.create_index(f'ix_{table}_pool', ['pool', 'create_date', 'id'], unique=False)
+
+    # Итоги ведутся по парам (очередь, пул)
+    op.drop_table('queuetotal')
+    op.create_table('queuetotal',
+    sa.Column('queue', sa.String(length=100), nullable=False),
+    sa.Column('pool', sa.String(length=100), server_default='', nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('queue', 'pool')
+    )
+    if sqlite:
+        for queue in QUEUES:
+            for statement in queue_total_ddl(queue):
+                op.execute(statement)
+
+
+def downgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        drop_triggers()
+    op.drop_table('queuetotal')
+    op.create_table('queuetotal',
+    sa.Column('queue', sa.String(length=100), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('queue')
+    )
+
+    for table in QUEUES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_pool')
+            drop_queue_indexes(batch_op, table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('pool')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            create_queue_indexes(batch_op, table, pool=False)
+
+    if sqlite:
+        for queue in QUEUES:
+            for statement in old_queue_total_ddl(queue):
+                op.execute(statement)
@@ -1,3 +1,4 @@
+from .allocation import router as allocation_router  # noqa
 from .charity_projects import router as charity_projects_router  # noqa
 from .donations import router as donations_router  # noqa
 from .google_api import router as google_api_router  # noqa
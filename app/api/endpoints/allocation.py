@@ -0,0 +1,74 @@
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_async_session
+from app.core.user import current_superuser
+from app.crud.charity_projects import crud_charity_projects
+from app.crud.donations import crud_donations
+from app.schemas.allocation import (
+    SimulationEvents,
+    SimulationStepDB,
+    TransferDB,
+)
+from app.services.allocation import simulate
+
+router = APIRouter()
+
+
+@router.post(
+    "/simulate",
+    response_model=list[SimulationStepDB],
+    dependencies=(Depends(current_superuser),),
+)
+async def simulate_allocation(
+    events: SimulationEvents,
+    pool: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Моделирование распределения без записи в БД - только для суперюзеров.
+
+    Гипотетические проекты и пожертвования добавляются в очереди
+    открытых объектов пула по порядку и получают id -1, -2, ...
+    Моделируется распределение в порядке создания (стратегия fifo).
+    """
+    if settings.invest_strategy != "fifo":
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Моделирование доступно только для стратегии fifo!",
+        )
+    project_ids, project_rests = await crud_charity_projects.get_open_queue(
+        session, pool
+    )
+    donation_ids, donation_rests = await crud_donations.get_open_queue(
+        session, pool
+    )
+    steps = simulate(
+        project_ids,
+        project_rests,
+        donation_ids,
+        donation_rests,
+        [(event.type, event.full_amount) for event in events],
+    )
+    return [
+        SimulationStepDB(
+            type=step.type,
+            id=step.id,
+            full_amount=step.full_amount,
+            invested_amount=step.invested_amount,
+            closed_project_ids=step.closed_project_ids,
+            closed_donation_ids=step.closed_donation_ids,
+            transfers=[
+                TransferDB(
+                    donation_id=donation_id,
+                    project_id=project_id,
+                    amount=amount,
+                )
+                for donation_id, project_id, amount in step.transfers
+            ],
+        )
+        for step in steps
+    ]
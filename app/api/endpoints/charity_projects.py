@@ -1,20 +1,33 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.etag import check_not_modified, get_data_version
+from app.api.filters import ListFilters
+from app.api.pagination import Page
+from app.api.projection import Fields, Projection
+from app.api.streaming import ndjson_response, wants_ndjson
 from app.api.utils import (
+    apply_plan,
     check_project_before_delete,
     check_project_before_update,
-    check_project_name_before_create_update,
-    invest_it,
+    check_project_id,
+    project_name_conflicts,
 )
 from app.core.db import get_async_session
 from app.core.user import current_superuser
 from app.crud.charity_projects import crud_charity_projects
+from app.crud.investments import crud_investments
+from app.models import CharityProject
 from app.schemas.charity_projects import (
+    ProjectBulkCreate,
     ProjectCreate,
     ProjectDB,
     ProjectUpdate,
 )
+from app.schemas.investments import InvestmentDB
+from app.services.rebalance import request_investment
 
 router = APIRouter(
     tags=["Charity Project"],
@@ -32,13 +45,32 @@ async def create_project(
     session: AsyncSession = Depends(get_async_session),
 ):
     """Создание нового проекта - только для суперюзеров."""
-    await check_project_name_before_create_update(
-        name=project.name, session=session
-    )
-    new_project = await crud_charity_projects.create(project, session)
-    await invest_it(session)
-    await session.refresh(new_project)
-    return new_project
+    async with project_name_conflicts(session):
+        new_project = await crud_charity_projects.create(project, session)
+    plan = await request_investment(session, project.pool)
+    return apply_plan(new_project, plan)
+
+
+@router.post(
+    "/bulk",
+    response_model=list[ProjectDB],
+    response_model_exclude_none=True,
+    dependencies=(Depends(current_superuser),),
+)
+async def create_projects(
+    projects: ProjectBulkCreate,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Пакетное создание проектов - только для суперюзеров."""
+    async with project_name_conflicts(
+        session, [project.name for project in projects]
+    ):
+        project_ids = await crud_charity_projects.create_multi(
+            projects, session
+        )
+    for pool in {project.pool for project in projects}:
+        await request_investment(session, pool)
+    return await crud_charity_projects.get_created(project_ids, session)
 
 
 @router.get(
@@ -47,11 +79,60 @@ async def create_project(
     response_model_exclude_none=True,
 )
 async def get_all_projects(
+    request: Request,
+    response: Response,
+    pool: Optional[str] = None,
+    page: Page = Depends(),
+    filters: ListFilters = Depends(),
+    projection: Projection = Depends(Fields(ProjectDB)),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Страница списка проектов (всех или пула) - любой пользователь.
+
+    С заголовком Accept: application/x-ndjson - поток всего списка.
+    Ответ содержит ETag; при совпадении If-None-Match - 304.
+    """
+    version = await get_data_version(session, CharityProject.__tablename__)
+    not_modified = check_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    columns = projection.columns(CharityProject)
+    if wants_ndjson(request):
+        return ndjson_response(
+            crud_charity_projects.stream_multi(
+                session,
+                pool=pool,
+                after=page.after,
+                columns=columns,
+                filters=filters,
+            ),
+            projection,
+            response,
+        )
+    projects = await crud_charity_projects.get_multi(
+        session,
+        pool=pool,
+        limit=page.limit + 1,
+        after=page.after,
+        columns=columns,
+        filters=filters,
+        version=version,
+    )
+    return projection.response(page.paginate(projects, response), response)
+
+
+@router.get(
+    "/{project_id}/investments",
+    response_model=list[InvestmentDB],
+    dependencies=(Depends(current_superuser),),
+)
+async def get_project_investments(
+    project_id: int,
     session: AsyncSession = Depends(get_async_session),
 ):
-    """Получение списка всех проектов - любой пользователь."""
-    projects = await crud_charity_projects.get_multi(session)
-    return projects
+    """Поступления пожертвований в проект - только для суперюзеров."""
+    await check_project_id(project_id, session)
+    return await crud_investments.get_by_project(project_id, session)
 
 
 @router.patch(
@@ -65,9 +146,9 @@ async def update_project(
     session: AsyncSession = Depends(get_async_session),
 ):
     """Редактирование проекта - только для суперюзеров."""
-    project = await crud_charity_projects.get(project_id, session)
-    await check_project_before_update(project, project_id, obj_in, session)
-    project = await crud_charity_projects.update(project, obj_in, session)
+    project = await check_project_before_update(project_id, obj_in, session)
+    async with project_name_conflicts(session):
+        project = await crud_charity_projects.update(project, obj_in, session)
     return project
 
 
@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.utils import invest_it
+from app.api.filters import ListFilters
+from app.api.pagination import Page
+from app.api.projection import Fields, Projection
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.api.utils import check_donation_owner
 from app.core.db import get_async_session
 from app.core.user import current_superuser, current_user
 from app.crud.donations import crud_donations
-from app.models import User
+from app.crud.investments import crud_investments
+from app.models import Donation, User
 from app.schemas.donations import (
+    DonationBulkCreate,
+    DonationBulkDB,
     DonationCreate,
     DonationFulltDB,
     DonationShortDB,
+    DonationStatus,
 )
+from app.schemas.investments import InvestmentDB
+from app.services.rebalance import is_allocated, request_investment
 
 router = APIRouter(
     tags=["Donations"],
@@ -31,11 +43,27 @@ async def create_donation(
 ):
     """Создание пожертвования зарегистрированным пользователем."""
     new_donation = await crud_donations.create(donation, session, user)
-    await invest_it(session)
-    await session.refresh(new_donation)
+    # Ответ не содержит сумм распределения - перечитывание не нужно
+    await request_investment(session, donation.pool)
     return new_donation
 
 
+@router.post(
+    "/bulk",
+    response_model=list[DonationBulkDB],
+)
+async def create_donations(
+    donations: DonationBulkCreate,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Пакетное создание пожертвований зарегистрированным пользователем."""
+    donation_ids = await crud_donations.create_multi(donations, session, user)
+    for pool in {donation.pool for donation in donations}:
+        await request_investment(session, pool)
+    return await crud_donations.get_created(donation_ids, session)
+
+
 @router.get(
     "/",
     response_model=list[DonationFulltDB],
@@ -43,11 +71,40 @@ async def create_donation(
     dependencies=(Depends(current_superuser),),
 )
 async def get_all_donations(
+    request: Request,
+    response: Response,
+    pool: Optional[str] = None,
+    page: Page = Depends(),
+    filters: ListFilters = Depends(),
+    projection: Projection = Depends(Fields(DonationFulltDB)),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """Список всех пожертвований всех пользователей."""
-    donations = await crud_donations.get_multi(session)
-    return donations
+    """Страница списка пожертвований всех пользователей (или пула).
+
+    С заголовком Accept: application/x-ndjson - поток всего списка.
+    """
+    columns = projection.columns(Donation)
+    if wants_ndjson(request):
+        return ndjson_response(
+            crud_donations.stream_multi(
+                session,
+                pool=pool,
+                after=page.after,
+                columns=columns,
+                filters=filters,
+            ),
+            projection,
+            response,
+        )
+    donations = await crud_donations.get_multi(
+        session,
+        pool=pool,
+        limit=page.limit + 1,
+        after=page.after,
+        columns=columns,
+        filters=filters,
+    )
+    return projection.response(page.paginate(donations, response), response)
 
 
 @router.get(
@@ -57,9 +114,68 @@ async def get_all_donations(
     dependencies=(Depends(current_user),),
 )
 async def get_user_donations(
+    request: Request,
+    response: Response,
+    pool: Optional[str] = None,
+    page: Page = Depends(),
+    filters: ListFilters = Depends(),
+    projection: Projection = Depends(Fields(DonationShortDB)),
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Страница списка пожертвований авторизованного пользователей.
+
+    С заголовком Accept: application/x-ndjson - поток всего списка.
+    """
+    columns = projection.columns(Donation)
+    if wants_ndjson(request):
+        return ndjson_response(
+            crud_donations.stream_multi(
+                session, user, pool, page.after, columns, filters
+            ),
+            projection,
+            response,
+        )
+    donations = await crud_donations.get_multi(
+        session,
+        user,
+        pool,
+        limit=page.limit + 1,
+        after=page.after,
+        columns=columns,
+        filters=filters,
+    )
+    return projection.response(page.paginate(donations, response), response)
+
+
+@router.get(
+    "/{donation_id}/investments",
+    response_model=list[InvestmentDB],
+)
+async def get_donation_investments(
+    donation_id: int,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Распределение пожертвования по проектам - автор или суперюзер."""
+    await check_donation_owner(donation_id, user, session)
+    return await crud_investments.get_by_donation(donation_id, session)
+
+
+@router.get(
+    "/{donation_id}/status",
+    response_model=DonationStatus,
+)
+async def get_donation_status(
+    donation_id: int,
     user: User = Depends(current_user),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """Список всех пожертвований авторизованного пользователей."""
-    donations = await crud_donations.get_multi(session, user)
-    return donations
+    """Состояние распределения пожертвования - автор или суперюзер."""
+    donation = await check_donation_owner(donation_id, user, session)
+    return DonationStatus(
+        id=donation.id,
+        invested_amount=donation.invested_amount,
+        fully_invested=donation.fully_invested,
+        allocated=is_allocated(donation),
+    )
@@ -0,0 +1,69 @@
+"""Условные запросы списков по версии данных.
+
+ETag ответа строится по счётчику версии таблицы (DataVersion) и
+параметрам запроса, влияющим на тело ответа. Запрос с совпавшим
+If-None-Match получает 304 после чтения одного счётчика - без
+обращения к самой таблице. Если счётчик не ведётся (БД без триггеров
+версий), ETag не выдаётся.
+
+Версия служит и поколением кэша чтения списка: изменения в обход
+приложения (другой процесс, app.cli check --fix) увеличивают счётчик,
+и ETag не может указывать на устаревшее тело из кэша.
+"""
+import hashlib
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import DataVersion
+
+
+async def get_data_version(session: AsyncSession, name: str) -> Optional[int]:
+    """Текущая версия данных таблицы."""
+    version = await session.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    )
+    return version.scalar()
+
+
+def make_etag(version: int, request: Request) -> str:
+    """ETag версии данных для параметров и формата запроса."""
+    variant = hashlib.sha1(
+        f"{request.url.query}|{request.headers.get('accept', '')}".encode()
+    ).hexdigest()[:16]
+    return f'"{version}-{variant}"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Совпадает ли ETag с одним из значений If-None-Match."""
+    if if_none_match is None:
+        return False
+    candidates = [
+        value.strip().removeprefix("W/") for value in if_none_match.split(",")
+    ]
+    return "*" in candidates or etag in candidates
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    version: Optional[int],
+) -> Optional[Response]:
+    """Ответ 304 для неизменённых данных версии version.
+
+    Для изменённых данных ETag устанавливается в response, и
+    возвращается None. Ту же версию эндпоинт передаёт в кэш чтения,
+    чтобы тело ответа соответствовало ETag.
+    """
+    if version is None:
+        return None
+    etag = make_etag(version, request)
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag}
+        )
+    response.headers["ETag"] = etag
+    return None
@@ -0,0 +1,68 @@
+"""Фильтры списков проектов и пожертвований.
+
+Каждый фильтр обслуживается индексом (см. CustomBase):
+    closed          - частичные индексы открытых и закрытых объектов
+                      по (create_date, id);
+    fully_invested  - (fully_invested, create_date, id);
+    created_from/to - (create_date, id);
+    min/max_amount  - (full_amount).
+Границы диапазонов включаются.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Query
+
+
+class ListFilters:
+    """Параметры фильтрации списка."""
+
+    def __init__(
+        self,
+        closed: Optional[bool] = Query(
+            None, description="только закрытые (true) или открытые (false)"
+        ),
+        fully_invested: Optional[bool] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_amount: Optional[int] = Query(None, ge=0),
+        max_amount: Optional[int] = Query(None, ge=0),
+    ):
+        self.closed = closed
+        self.fully_invested = fully_invested
+        self.created_from = created_from
+        self.created_to = created_to
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    def key(self) -> tuple:
+        """Значения фильтров для ключа кэша."""
+        return (
+            self.closed,
+            self.fully_invested,
+            self.created_from,
+            self.created_to,
+            self.min_amount,
+            self.max_amount,
+        )
+
+    def where(self, model) -> list:
+        """Условия выборки модели."""
+        clauses = []
+        if self.closed is not None:
+            clauses.append(
+                model.close_date.isnot(None)
+                if self.closed
+                else model.close_date.is_(None)
+            )
+        if self.fully_invested is not None:
+            clauses.append(model.fully_invested == self.fully_invested)
+        if self.created_from is not None:
+            clauses.append(model.create_date >= self.created_from)
+        if self.created_to is not None:
+            clauses.append(model.create_date <= self.created_to)
+        if self.min_amount is not None:
+            clauses.append(model.full_amount >= self.min_amount)
+        if self.max_amount is not None:
+            clauses.append(model.full_amount <= self.max_amount)
+        return clauses
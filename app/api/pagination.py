@@ -0,0 +1,62 @@
+"""Постраничная (keyset) выдача списков в порядке (create_date, id).
+
+Страница задаётся размером limit и курсором - непрозрачной строкой с
+позицией последнего выданного объекта. Курсор следующей страницы
+возвращается в заголовке X-Next-Cursor; заголовка нет на последней
+странице. Тело ответа остаётся списком объектов.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(create_date: datetime, obj_id: int) -> str:
+    """Курсор позиции объекта в списке."""
+    position = json.dumps([create_date.isoformat(), obj_id])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Позиция (create_date, id) из курсора."""
+    try:
+        create_date, obj_id = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        return datetime.fromisoformat(create_date), int(obj_id)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Некорректный курсор страницы!",
+        )
+
+
+class Page:
+    """Параметры страницы списка."""
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.page_size, ge=1, le=settings.page_size_max
+        ),
+        cursor: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor is not None else None
+
+    def paginate(self, objs: list, response: Response) -> list:
+        """Страница из limit + 1 объектов выборки; курсор - в заголовок."""
+        if len(objs) > self.limit:
+            objs = objs[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                objs[-1].create_date, objs[-1].id
+            )
+        return objs
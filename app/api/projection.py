@@ -0,0 +1,92 @@
+"""Выборка только нужных ответу столбцов.
+
+Списки читаются запросом по столбцам схемы ответа, без создания
+объектов ORM. Параметр ?fields=id,invested_amount сужает ответ до
+перечисленных полей схемы; такой ответ собирается напрямую из строк
+выборки. Столбцы id и create_date читаются всегда - по ним строится
+курсор страницы.
+"""
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Столбцы, необходимые для курсора страницы
+KEY_COLUMNS = ("id", "create_date")
+
+
+def with_headers(target: Response, response: Response) -> Response:
+    """Заголовки, установленные эндпоинтом в response, - в ответ target."""
+    target.headers.update(
+        {
+            name: value
+            for name, value in response.headers.items()
+            if name != "content-length"
+        }
+    )
+    return target
+
+
+class Projection:
+    """Поля схемы ответа, запрошенные клиентом."""
+
+    def __init__(self, schema: type[BaseModel], fields: Optional[str]):
+        self.schema = schema
+        self.names = list(schema.__fields__)
+        self.sparse = fields is not None
+        if self.sparse:
+            names = [name.strip() for name in fields.split(",")]
+            unknown = [name for name in names if name not in self.names]
+            if unknown or not any(names):
+                raise HTTPException(
+                    status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                    detail=f"Неизвестные поля: {', '.join(unknown)}!",
+                )
+            self.names = list(dict.fromkeys(names))
+
+    def columns(self, model) -> list:
+        """Столбцы модели для выборки."""
+        names = dict.fromkeys((*self.names, *KEY_COLUMNS))
+        return [getattr(model, name) for name in names]
+
+    def dump(self, row) -> dict:
+        """Представление строки выборки без пустых полей."""
+        if not self.sparse:
+            return jsonable_encoder(
+                self.schema.from_orm(row), exclude_none=True
+            )
+        return jsonable_encoder(
+            {name: getattr(row, name) for name in self.names},
+            exclude_none=True,
+        )
+
+    def response(self, rows: list, response: Response):
+        """Ответ со списком строк.
+
+        Полный набор полей проверяет response_model эндпоинта, суженный
+        ответ возвращается как есть - с заголовками, установленными
+        эндпоинтом в response.
+        """
+        if not self.sparse:
+            return rows
+        return with_headers(
+            JSONResponse([self.dump(row) for row in rows]), response
+        )
+
+
+class Fields:
+    """Зависимость: проекция схемы ответа по параметру ?fields=."""
+
+    def __init__(self, schema: type[BaseModel]):
+        self.schema = schema
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(
+            None, description="поля ответа через запятую"
+        ),
+    ) -> Projection:
+        return Projection(self.schema, fields)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import (
+    allocation_router,
     charity_projects_router,
     donations_router,
     google_api_router,
@@ -19,6 +20,10 @@ main_router.include_router(
     donations_router, prefix="/donation", tags=["Donations"]
 )
 
+main_router.include_router(
+    allocation_router, prefix="/allocation", tags=["Allocation"]
+)
+
 main_router.include_router(
     google_api_router, prefix="/google", tags=["Google"]
 )
@@ -0,0 +1,39 @@
+"""Потоковая выдача списков в формате NDJSON.
+
+Клиент запрашивает поток заголовком Accept: application/x-ndjson.
+Объекты читаются из БД пакетами и записываются в ответ по одному
+JSON-объекту на строку по мере сериализации, поэтому память не растёт
+с размером списка. Поток содержит весь список после курсора - размер
+страницы не применяется.
+"""
+import json
+from typing import AsyncIterator
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.api.projection import Projection, with_headers
+
+NDJSON = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Запрошена ли потоковая выдача."""
+    return NDJSON in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    rows: AsyncIterator, projection: Projection, response: Response
+) -> StreamingResponse:
+    """Поток строк в представлении проекции схемы ответа.
+
+    Заголовки, установленные эндпоинтом в response, переносятся в поток.
+    """
+
+    async def lines():
+        async for row in rows:
+            yield json.dumps(projection.dump(row), ensure_ascii=False) + "\n"
+
+    return with_headers(
+        StreamingResponse(lines(), media_type=NDJSON), response
+    )
@@ -1,13 +1,53 @@
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
 from datetime import datetime
 from http import HTTPStatus
+from typing import Optional
 
 from fastapi import HTTPException
-from sqlalchemy import asc, func, select
+from sqlalchemy import (
+    and_,
+    bindparam,
+    func,
+    insert,
+    not_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.exc import StaleDataError
 
 import app.crud.charity_projects as crud
-from app.models import CharityProject, Donation
+import app.crud.donations as donations_crud
+from app.core.config import settings
+from app.models import (
+    CharityProject,
+    Donation,
+    Investment,
+    QueueTotal,
+    User,
+)
+from app.models.queue_total import QUEUES
 from app.schemas.charity_projects import ProjectUpdate
+from app.services.allocation import AllocationPlan, QueuePlan, allocate
+from app.services.cache import read_cache
+from app.services.strategies import FIFO, get_strategy
+
+# Размер пакета при выборке открытых проектов и пожертвований
+INVEST_BATCH_SIZE = 100
+
+
+# Сообщения о нарушении уникальности имени проекта (SQLite, PostgreSQL)
+PROJECT_NAME_UNIQUE = ("charityproject.name", "charityproject_name_key")
+
+
+class AllocationConflict(Exception):
+    """Строки очереди изменены параллельной транзакцией."""
 
 
 def get_current_time():
@@ -15,21 +55,70 @@ def get_current_time():
     return datetime.now()
 
 
-async def check_project_name_before_create_update(
-    name: str,
+@asynccontextmanager
+async def project_name_conflicts(
     session: AsyncSession,
+    names: Optional[list[str]] = None,
 ):
-    """Проверка имени проекта на уникальность."""
-    db_obj = await crud.crud_charity_projects.get_project_by_name(
-        name=name, session=session
-    )
-    if db_obj is not None:
+    """Нарушение уникальности имени проекта при записи - ошибка 400.
+
+    Уникальность обеспечивает ограничение БД, отдельной проверки перед
+    записью нет. Для пакета names занятые имена выбираются только после
+    отказа - для сообщения об ошибке.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        await session.rollback()
+        if not any(name in str(error.orig) for name in PROJECT_NAME_UNIQUE):
+            raise
+        if names is not None:
+            await check_project_names_before_create(names, session)
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Проект с таким именем уже существует!",
         )
 
 
+@asynccontextmanager
+async def stale_version_conflicts(session: AsyncSession):
+    """Запись объекта, изменённого после загрузки, - ошибка 409.
+
+    Версия строки (version_id_col) не совпала: между загрузкой объекта
+    и записью его изменила другая транзакция, например проход
+    распределения.
+    """
+    try:
+        yield
+    except StaleDataError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail="Объект изменён другим запросом, повторите попытку!",
+        )
+
+
+async def check_project_names_before_create(
+    names: list[str],
+    session: AsyncSession,
+):
+    """Проверка уникальности имён пакета проектов одним запросом."""
+    duplicates = {name for name in names if names.count(name) > 1}
+    duplicates.update(
+        await crud.crud_charity_projects.get_existing_names(
+            names=list(set(names)), session=session
+        )
+    )
+    if duplicates:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=(
+                "Проекты с такими именами уже существуют: "
+                f"{', '.join(sorted(duplicates))}!"
+            ),
+        )
+
+
 async def check_project_id(
     project_id: int,
     session: AsyncSession,
@@ -44,26 +133,37 @@ async def check_project_id(
     return project
 
 
+async def check_donation_owner(
+    donation_id: int,
+    user: User,
+    session: AsyncSession,
+):
+    """Проверка доступа пользователя к пожертванию."""
+    donation = await donations_crud.crud_donations.get(donation_id, session)
+    if donation is None or (
+        not user.is_superuser and donation.user_id != user.id
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Пожертвование {donation_id} не найдено!",
+        )
+    return donation
+
+
 async def check_project_before_update(
-    project: CharityProject,
     project_id: int,
     obj_in: ProjectUpdate,
     session: AsyncSession,
-):
-    """Проверка проекта перед обновлением."""
+) -> CharityProject:
+    """Проверка проекта перед обновлением; возвращается проект."""
     # Проверка существования проекта с таким id
-    await check_project_id(project_id, session)
+    project = await check_project_id(project_id, session)
     # Проверка статуса "открыт/закрыт" для инвестирования
     if project.fully_invested is True or project.close_date:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Закрытый проект нельзя редактировать!",
         )
-    # Проверка, что название проекта остается уникальным
-    if obj_in.name is not None and obj_in.name != project.name:
-        await check_project_name_before_create_update(
-            name=obj_in.name, session=session
-        )
     # Проверка, что новая сумма проекта не меньше зачисленных средств
     if obj_in.full_amount and project.invested_amount > obj_in.full_amount:
         raise HTTPException(
@@ -71,6 +171,7 @@ async def check_project_before_update(
             detail=(f"Новая сумма проекта {obj_in.full_amount} не может быть"
                     " меньше внесенной - {project.invested_amount}!",)
         )
+    return project
 
 
 async def check_project_before_delete(project_id, session):
@@ -85,127 +186,445 @@ async def check_project_before_delete(project_id, session):
     return project
 
 
-async def invest_it(
-    session: AsyncSession,
-):
-    """Функция инвестирования."""
-    # Выборка активных проектов с сортировкой
-    project_objs = await session.execute(
-        select(CharityProject)
-        .where(CharityProject.close_date.is_(None))
-        .order_by(asc(CharityProject.create_date))
+def apply_plan(project: CharityProject, plan: Optional[AllocationPlan]):
+    """Состояние нового проекта после распределения - по плану прохода."""
+    if plan is None:
+        # Распределение выполнит фоновый обработчик
+        return project
+    project.invested_amount += plan.project_invested(project.id)
+    if project.id in plan.projects.closed_ids:
+        project.fully_invested = True
+        project.close_date = plan.date
+    return project
+
+
+def queue_after(order, position):
+    """Условие "объект стоит в очереди после объекта с ключом position"."""
+    return tuple_(*order) > tuple_(*position)
+
+
+def open_rows(model, pool: Optional[str]):
+    """Условие "открытый объект пула" (None - общий пул)."""
+    return and_(model.close_date.is_(None), model.pool == pool)
+
+
+def queue_columns(model):
+    """Столбцы, необходимые для распределения средств."""
+    return (
+        model.id,
+        model.create_date,
+        model.full_amount,
+        model.invested_amount,
+        model.version,
     )
-    project_objs = project_objs.scalars().all()
-
-    # Подсчет стоимости активных проектов и суммы
-    # финансирования
-    project_sum = await session.execute(
-        select(
-            func.sum(CharityProject.full_amount),
-            func.sum(CharityProject.invested_amount),
-        ).where(CharityProject.close_date.is_(None))
+
+
+class OpenQueue:
+    """Очередь открытых объектов модели в порядке стратегии.
+
+    Объекты подгружаются из БД пакетами по мере необходимости,
+    поэтому читается только используемая часть очереди (и только
+    необходимые столбцы, без создания ORM-объектов); память
+    ограничена этой частью независимо от размера очереди.
+    Результат распределения записывается несколькими групповыми
+    UPDATE. Порядок очереди задаёт стратегия (по умолчанию FIFO).
+    """
+
+    def __init__(
+        self,
+        model,
+        session: AsyncSession,
+        strategy=FIFO,
+        pool: Optional[str] = None,
+    ):
+        self.model = model
+        self.session = session
+        self.strategy = strategy
+        self.pool = pool
+        self.rows = []
+        self.ids = []
+        self.rests = []
+        # Сумма остатков загруженной части очереди
+        self.total = 0
+        self.exhausted = False
+        # Поток строк очереди (курсор на стороне сервера)
+        self.stream = None
+
+    def order_by(self, model=None) -> tuple:
+        """Ключ сортировки очереди для модели или её псевдонима."""
+        return self.strategy.order_by(model or self.model)
+
+    def order_columns(self) -> list:
+        """Выражения ключа сортировки под именами order_0, order_1, ..."""
+        return [
+            key.label(f"order_{number}")
+            for number, key in enumerate(self.order_by())
+        ]
+
+    def position(self, row) -> tuple:
+        """Значение ключа сортировки загруженной строки."""
+        return tuple(
+            getattr(row, f"order_{number}")
+            for number in range(len(self.order_by()))
+        )
+
+    async def load(self):
+        """Загрузка следующей части очереди."""
+        for row in await self._fetch():
+            rest = row.full_amount - row.invested_amount
+            self.rows.append(row)
+            self.ids.append(row.id)
+            self.rests.append(rest)
+            self.total += rest
+
+    async def apply(self, plan: QueuePlan, close_date: datetime):
+        """Запись результатов распределения в БД.
+
+        Запись условная (compare-and-swap): если после загрузки очереди
+        затронутые строки изменились, вызывается AllocationConflict.
+        """
+        if not plan.prefix:
+            await self._apply_rows(plan, close_date)
+            return
+        model = self.model
+        closed = len(plan.closed_ids)
+        # Все открытые объекты до последнего закрытого включительно
+        # закрываются одним запросом по диапазону очереди
+        if closed:
+            last_closed = self.position(self.rows[closed - 1])
+            # Диапазон не изменился, если в нём столько же строк
+            # и та же сумма версий: версии только возрастают
+            queue = aliased(model)
+            queue_range = select(func.count(), func.sum(queue.version)).where(
+                open_rows(queue, self.pool),
+                not_(queue_after(self.order_by(queue), last_closed)),
+            )
+            versions = sum(row.version for row in self.rows[:closed])
+            result = await self.session.execute(
+                update(model)
+                .where(
+                    open_rows(model, self.pool),
+                    not_(queue_after(self.order_by(), last_closed)),
+                    queue_range.with_only_columns(func.count())
+                    .scalar_subquery() == closed,
+                    queue_range.with_only_columns(func.sum(queue.version))
+                    .scalar_subquery() == versions,
+                )
+                .values(
+                    invested_amount=model.full_amount,
+                    fully_invested=True,
+                    close_date=close_date,
+                    version=model.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != closed:
+                raise AllocationConflict(model.__tablename__)
+        # Частично инвестированный объект на границе
+        if plan.boundary_delta:
+            boundary = self.rows[closed]
+            invested_amount = model.invested_amount + plan.boundary_delta
+            result = await self.session.execute(
+                update(model)
+                .where(
+                    model.id == boundary.id,
+                    model.version == boundary.version,
+                )
+                .values(
+                    invested_amount=invested_amount,
+                    version=model.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise AllocationConflict(model.__tablename__)
+
+    async def _apply_rows(self, plan: QueuePlan, close_date: datetime):
+        """Запись плана, не образующего префикс очереди.
+
+        Каждая строка обновляется с проверкой версии; закрываемые
+        и пополняемые строки записываются двумя пакетными UPDATE.
+        """
+        table = self.model.__table__
+        versions = {row.id: row.version for row in self.rows}
+        for rows, values in (
+            (
+                [(obj_id, 0) for obj_id in plan.closed_ids],
+                dict(
+                    invested_amount=table.c.full_amount,
+                    fully_invested=True,
+                    close_date=close_date,
+                ),
+            ),
+            (
+                plan.deltas,
+                dict(
+                    invested_amount=(
+                        table.c.invested_amount + bindparam("row_delta")
+                    ),
+                ),
+            ),
+        ):
+            if not rows:
+                continue
+            result = await self.session.execute(
+                update(table)
+                .where(
+                    table.c.id == bindparam("row_id"),
+                    table.c.version == bindparam("row_version"),
+                )
+                .values(version=table.c.version + 1, **values),
+                [
+                    {
+                        "row_id": obj_id,
+                        "row_version": versions[obj_id],
+                        "row_delta": delta,
+                    }
+                    for obj_id, delta in rows
+                ],
+            )
+            if result.rowcount != len(rows):
+                raise AllocationConflict(self.model.__tablename__)
+
+    async def _fetch(self):
+        """Следующий пакет открытых объектов.
+
+        Очередь читается одним запросом с курсором на стороне сервера
+        пакетами по INVEST_BATCH_SIZE строк.
+        """
+        if self.stream is None:
+            model = self.model
+            self.stream = await self.session.stream(
+                select(*queue_columns(model), *self.order_columns())
+                .where(open_rows(model, self.pool))
+                .order_by(*self.order_by())
+                .execution_options(yield_per=INVEST_BATCH_SIZE)
+            )
+        batch = await self.stream.fetchmany(INVEST_BATCH_SIZE)
+        if len(batch) < INVEST_BATCH_SIZE:
+            self.exhausted = True
+            await self.close()
+        return batch
+
+    async def close(self):
+        """Закрытие курсора: оставшаяся часть очереди не читается."""
+        if self.stream is not None:
+            await self.stream.close()
+            self.stream = None
+
+
+class WindowQueue(OpenQueue):
+    """Очередь, граница которой вычисляется в БД оконной функцией.
+
+    Нарастающий итог остатков SUM(full_amount - invested_amount)
+    в порядке очереди сравнивается с суммой остатков открытых объектов
+    противоположной очереди, поэтому одним запросом читаются только
+    объекты до границы распределения включительно.
+    """
+
+    def __init__(
+        self,
+        model,
+        session: AsyncSession,
+        opposite,
+        available=None,
+        strategy=FIFO,
+        pool: Optional[str] = None,
+    ):
+        super().__init__(model, session, strategy, pool)
+        self.opposite = opposite
+        # Сумма остатков противоположной очереди, если известна
+        self.available = available
+
+    async def _fetch(self):
+        """Открытые объекты до границы распределения."""
+        model, opposite = self.model, self.opposite
+        rest = model.full_amount - model.invested_amount
+        order = self.order_columns()
+        queue = (
+            select(
+                *queue_columns(model),
+                *order,
+                rest.label("rest"),
+                func.sum(rest).over(order_by=self.order_by()).label("running"),
+            )
+            .where(open_rows(model, self.pool))
+            .subquery()
+        )
+        available = self.available
+        if available is None:
+            available = (
+                select(
+                    func.coalesce(
+                        func.sum(
+                            opposite.full_amount - opposite.invested_amount
+                        ),
+                        0,
+                    )
+                )
+                .where(open_rows(opposite, self.pool))
+                .scalar_subquery()
+            )
+        order = [queue.c[key.name] for key in order]
+        rows = await self.session.execute(
+            select(
+                queue.c.id,
+                queue.c.create_date,
+                queue.c.full_amount,
+                queue.c.invested_amount,
+                queue.c.version,
+                *order,
+            )
+            .where(queue.c.running - queue.c.rest < available)
+            .order_by(*order)
+        )
+        self.exhausted = True
+        return rows.all()
+
+
+async def get_open_totals(
+    session: AsyncSession, pool: Optional[str] = None
+) -> dict:
+    """Суммы остатков открытых объектов пула из таблицы итогов."""
+    totals = await session.execute(
+        select(QueueTotal.queue, QueueTotal.amount).where(
+            QueueTotal.pool == (pool or "")
+        )
     )
-    project_sum = project_sum.fetchall()
-    project_full = 0 if project_sum[0][0] is None else project_sum[0][0]
-    project_invested = (0 if project_sum[0][1] is None
-                        else project_sum[0][1])
-
-    # Вычисление суммы необходимого финансирования
-    to_invest = project_full - project_invested
-
-    # Выборка активных пожертвований с сортировкой
-    donation_objs = await session.execute(
-        select(Donation)
-        .where(Donation.close_date.is_(None))
-        .order_by(asc(Donation.create_date))
+    return dict(totals.all())
+
+
+def open_queues(
+    session: AsyncSession,
+    totals: Optional[dict] = None,
+    pool: Optional[str] = None,
+):
+    """Очереди проектов и пожертвований пула для settings.invest_mode.
+
+    Порядок очереди проектов задаёт settings.invest_strategy.
+    """
+    totals = totals or {}
+    strategy = get_strategy()
+    if settings.invest_mode != "window":
+        return (
+            OpenQueue(CharityProject, session, strategy, pool),
+            OpenQueue(Donation, session, pool=pool),
+        )
+    donations = WindowQueue(
+        Donation,
+        session,
+        CharityProject,
+        totals.get(CharityProject.__tablename__),
+        pool=pool,
     )
-    donation_objs = donation_objs.scalars().all()
-
-    # Подсчет сумм полученных и распределенных
-    # пожертвований
-    donation_sum = await session.execute(
-        select(
-            func.sum(Donation.full_amount), func.sum(Donation.invested_amount)
-        ).where(Donation.close_date.is_(None))
+    if not strategy.prefix:
+        # План затрагивает всю очередь проектов
+        return OpenQueue(CharityProject, session, strategy, pool), donations
+    projects = WindowQueue(
+        CharityProject,
+        session,
+        Donation,
+        totals.get(Donation.__tablename__),
+        strategy,
+        pool,
     )
-    donation_sum = donation_sum.fetchall()
-    donation_full = 0 if donation_sum[0][0] is None else donation_sum[0][0]
-    donation_invested = (0 if donation_sum[0][1] is None
-                         else donation_sum[0][1])
-
-    # Вычисление суммы доступного финансирования
-    to_be_invested = donation_full - donation_invested
-
-    # Обработка списка проектов
-    for project in project_objs:
-        # Распределение финансирования ведется, пока
-        # есть потребность и доступные средства
-        if to_be_invested > 0 and to_invest > 0:
-            # Вычисление необходимого финансирования на проект
-            project_to_invest = project.full_amount - project.invested_amount
-            # Если сумма инвестиций для проекта меньше
-            # доступной суммы финансирования
-            if project_to_invest <= to_be_invested:
-                # Увеличиваем в проекте сумму
-                # "invested_amount" = "full_amount"
-                setattr(project, "invested_amount", project.full_amount)
-                setattr(project, "close_date", get_current_time())
-                setattr(project, "fully_invested", True)
-                # Уменьшаем сумму требуемого финансирования (на все проекты)
-                to_invest = to_invest - project_to_invest
-                # Уменьшаем сумму доступного финансирования
-                to_be_invested = to_be_invested - project_to_invest
-                session.add(project)
-            # Если сумма инвестиций для проекта больше
-            # доступной суммы финансирования
-            else:
-                # Увеличиваем баланс полученного финансирования на всю
-                # оставшуюся сумму пожертвований
-                setattr(
-                    project,
-                    "invested_amount",
-                    project.invested_amount + to_be_invested,
-                )
-                session.add(project)
-                # И прекращаем распределение пожертвований по проектам
+    return projects, donations
+
+
+async def load_queues(projects: OpenQueue, donations: OpenQueue):
+    """Загрузка минимальных префиксов очередей для распределения.
+
+    Догружается очередь с меньшей загруженной суммой: когда она
+    исчерпана, её сумма и есть распределяемая сумма, а загруженная
+    часть другой очереди её покрывает. Курсоры закрываются сразу
+    по достижении границы. Для стратегии, план которой не образует
+    префикс, очередь проектов загружается целиком.
+    """
+    try:
+        while not (projects.strategy.prefix or projects.exhausted):
+            await projects.load()
+        while True:
+            queue = min(projects, donations, key=lambda queue: queue.total)
+            if queue.exhausted:
                 break
-        # Если потребность в финансировании или пожертвования закончились
-        else:
-            # Прекращаем распределение пожертвований по проектам
-            break
-    # Восстанавливаем первоначальные значение суммы доступных пожертвований
-    to_be_invested = donation_full - donation_invested
-    # и сумму потребности в инвестировании
-    to_invest = project_full - project_invested
-    # Определяем на какую величину будет уменьшена
-    # сумма доступных пожертвований
-    to_be_invested = min(to_be_invested, to_invest)
-
-    # Обработка списка пожертвований
-    for donation in donation_objs:
-        # Вычисление доступную сумму пожертвования
-        donation_to_be_invested = (
-            donation.full_amount - donation.invested_amount
-        )
-        # Если сумма пожертвования меньше доступной суммы пожертвований
-        if donation_to_be_invested <= to_be_invested:
-            # Увеличиваем в пожертвовании сумму
-            # "invested_amount" = "full_amount"
-            setattr(donation, "invested_amount", donation.full_amount)
-            setattr(donation, "close_date", get_current_time())
-            setattr(donation, "fully_invested", True)
-            # Увеличиваем в проекте сумму "invested_amount" = "full_amount"
-            to_be_invested = to_be_invested - donation_to_be_invested
-            # print("Осталось распределить пожертвований - ", to_be_invested)
-            session.add(donation)
-
-        else:
-            setattr(
-                donation,
-                "invested_amount",
-                donation.invested_amount + to_be_invested,
-            )
-            session.add(donation)
-            break
+            await queue.load()
+    finally:
+        await projects.close()
+        await donations.close()
+
 
+async def invest_once(
+    session: AsyncSession, pool: Optional[str] = None
+) -> AllocationPlan:
+    """Один проход распределения пула в рамках транзакции."""
+    now = get_current_time()
+    totals = await get_open_totals(session, pool)
+    if len(totals) == len(QUEUES) and not min(totals.values()):
+        # Одна из очередей пуста - распределять нечего
+        return allocate([], [], [], [])
+    projects, donations = open_queues(session, totals, pool)
+    await load_queues(projects, donations)
+    plan = allocate(
+        projects.ids,
+        projects.rests,
+        donations.ids,
+        donations.rests,
+        projects.strategy,
+    )
+    plan.date = now
+    await projects.apply(plan.projects, now)
+    await donations.apply(plan.donations, now)
+    # Журнал переводов записывается одним пакетным INSERT
+    if plan.transfers:
+        await session.execute(
+            insert(Investment),
+            [
+                {
+                    "donation_id": donation_id,
+                    "project_id": project_id,
+                    "amount": amount,
+                    "create_date": now,
+                }
+                for donation_id, project_id, amount in plan.transfers
+            ],
+        )
     await session.commit()
+    if plan.transfers:
+        await read_cache.invalidate(*QUEUES)
+    return plan
+
+
+async def invest_it(
+    session: AsyncSession,
+    pool: Optional[str] = None,
+) -> Optional[AllocationPlan]:
+    """Функция инвестирования.
+
+    Открытые пожертвования пула pool (None - общий пул) распределяются
+    по открытым проектам того же пула в порядке создания. Проходы
+    разных пулов не затрагивают строк друг друга. Из БД читается только
+    минимальный префикс обеих очередей: при поступлении одного
+    пожертвования или проекта затрагивается только он и необходимая
+    часть противоположной очереди.
+    В режиме invest_mode="window" граница очередей вычисляется в БД.
+    Если итог одной из очередей (таблица queuetotal) равен нулю,
+    очереди не читаются вовсе.
+    Расчёт выполняет app.services.allocation.allocate, здесь план
+    только применяется; каждый перевод записывается в журнал инвестиций.
+
+    При конфликте с параллельным распределением проход повторяется
+    не более settings.invest_retries раз. Если конфликт не разрешился,
+    возвращается None: открытые объекты будут распределены следующим
+    проходом. Объекты сессии после вызова требуют обновления (refresh).
+    """
+    for attempt in range(settings.invest_retries + 1):
+        try:
+            return await invest_once(session, pool)
+        except AllocationConflict as error:
+            await session.rollback()
+            logging.info(f"Конфликт распределения ({error}), повтор.")
+            await asyncio.sleep(
+                settings.invest_retry_delay * 2 ** attempt * random.random()
+            )
+    logging.warning("Распределение отложено: конфликт не разрешился.")
+    return None
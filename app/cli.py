@@ -0,0 +1,61 @@
+"""Служебные команды.
+
+Проверка сумм инвестирования:
+    python -m app.cli check [--fix] [--chunk-size N] [--checkpoint FILE]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.services.consistency import CHUNK_SIZE, check_consistency
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser(
+        "check",
+        help="проверка invested_amount, fully_invested и close_date",
+    )
+    check.add_argument(
+        "--fix", action="store_true", help="исправить расхождения"
+    )
+    check.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help="число строк в пакете (и в транзакции исправления)",
+    )
+    check.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="файл прогресса для продолжения прерванной проверки",
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    if settings.invest_strategy != "fifo":
+        # Каноническое состояние определено только для порядка создания
+        print("Проверка доступна только для стратегии fifo.")
+        return 2
+    report = asyncio.run(
+        check_consistency(
+            AsyncSessionLocal,
+            fix=args.fix,
+            chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint,
+        )
+    )
+    print(
+        f"Проверено строк: {report.checked}, "
+        f"расхождений: {report.mismatches}, исправлено: {report.fixed}"
+    )
+    return 1 if report.mismatches > report.fixed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
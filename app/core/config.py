@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseSettings
 
@@ -8,6 +8,30 @@ class Settings(BaseSettings):
     app_description: str = ""
     database_url: str = "sqlite+aiosqlite:///./fastapi.db"
     secret: str = "SECRET"
+    # Режим распределения пожертвований
+    invest_mode: Literal["batched", "window"] = "batched"
+    # Стратегия распределения по проектам
+    invest_strategy: Literal[
+        "fifo", "closest", "priority", "proportional"
+    ] = "fifo"
+    # Повторы распределения при конфликте параллельных изменений
+    invest_retries: int = 3
+    invest_retry_delay: float = 0.01
+    # Фоновое распределение: проходы не чаще раза в invest_window секунд
+    invest_in_background: bool = False
+    invest_window: float = 0.05
+    # Максимальное число объектов в одном пакетном запросе
+    bulk_max_items: int = 10000
+    # Размер страницы списков по умолчанию и максимальный
+    page_size: int = 100
+    page_size_max: int = 1000
+    # Размер пакета строк при потоковой выдаче списков
+    stream_chunk_size: int = 1000
+    # Кэш чтения списков: время жизни записи (0 - кэш отключён),
+    # число записей в памяти процесса, адрес общего бэкенда (redis://...)
+    cache_ttl: float = 5.0
+    cache_maxsize: int = 1024
+    cache_url: Optional[str] = None
     # Google
     type: Optional[str] = None
     project_id: Optional[str] = None
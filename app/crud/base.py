@@ -1,11 +1,12 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import asc, func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.api.utils as utils
+from app.core.config import settings
 from app.models import User
+from app.services.cache import read_cache
 
 
 class CRUDBase:
@@ -17,29 +18,144 @@ class CRUDBase:
         obj_id: int,
         session: AsyncSession,
     ):
-        """Получение объекта по id."""
-        db_obj = await session.execute(
-            select(self.model).where(self.model.id == obj_id)
-        )
+        """Получение объекта по id.
 
-        return db_obj.scalars().first()
+        Сессия живёт один запрос, поэтому объект, уже загруженный в неё
+        (валидатором или эндпоинтом), берётся из карты идентичности без
+        обращения к БД.
+        """
+        return await session.get(self.model, obj_id)
 
-    async def get_multi(
-        self, session: AsyncSession, user: Optional[User] = None
+    def multi_query(
+        self,
+        user: Optional[User] = None,
+        pool: Optional[str] = None,
+        after: Optional[tuple] = None,
+        columns: Optional[list] = None,
+        filters=None,
     ):
-        """Получение списка всех объектов."""
-        request_text = select(self.model)
+        """Запрос списка объектов (всех или пула) в порядке создания.
+
+        after - позиция (create_date, id), после которой начинается
+        выборка; columns - выбираемые столбцы вместо объектов модели;
+        filters - фильтры списка (app.api.filters.ListFilters).
+        """
+        request_text = select(*columns or (self.model,)).order_by(
+            asc(self.model.create_date), asc(self.model.id)
+        )
 
         if user is not None:
             request_text = request_text.where(self.model.user_id == user.id)
 
-        db_objs = await session.execute(request_text)
-        return db_objs.scalars().all()
+        if pool is not None:
+            request_text = request_text.where(self.model.pool == pool)
+
+        if after is not None:
+            request_text = request_text.where(
+                tuple_(self.model.create_date, self.model.id) > tuple_(*after)
+            )
+
+        if filters is not None:
+            request_text = request_text.where(*filters.where(self.model))
+        return request_text
+
+    async def get_multi(
+        self,
+        session: AsyncSession,
+        user: Optional[User] = None,
+        pool: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        columns: Optional[list] = None,
+        filters=None,
+        version: Optional[int] = None,
+    ):
+        """Получение списка объектов (не больше limit).
+
+        При columns возвращаются строки выборки, а не объекты модели;
+        строки читаются через кэш чтения. version - версия данных
+        таблицы (DataVersion), по которой построен ETag ответа; она
+        заменяет поколение кэша процесса.
+        """
+        request_text = self.multi_query(user, pool, after, columns, filters)
+
+        if limit is not None:
+            request_text = request_text.limit(limit)
+
+        if not columns:
+            db_objs = await session.execute(request_text)
+            return db_objs.scalars().all()
+
+        async def load():
+            db_objs = await session.execute(request_text)
+            return db_objs.all()
+
+        key = repr(
+            (
+                None if user is None else user.id,
+                pool,
+                limit,
+                after,
+                [column.key for column in columns],
+                None if filters is None else filters.key(),
+            )
+        )
+        return await read_cache.get_or_load(
+            self.model.__tablename__, key, load, version
+        )
+
+    async def stream_multi(
+        self,
+        session: AsyncSession,
+        user: Optional[User] = None,
+        pool: Optional[str] = None,
+        after: Optional[tuple] = None,
+        columns: Optional[list] = None,
+        filters=None,
+    ) -> AsyncIterator:
+        """Потоковое чтение списка объектов (или строк columns) пакетами.
+
+        Строки читаются курсором БД по settings.stream_chunk_size, в памяти
+        находится только текущий пакет.
+        """
+        chunk_size = settings.stream_chunk_size
+        result = await session.stream(
+            self.multi_query(
+                user, pool, after, columns, filters
+            ).execution_options(yield_per=chunk_size)
+        )
+        if not columns:
+            result = result.scalars()
+        try:
+            async for chunk in result.partitions(chunk_size):
+                for db_obj in chunk:
+                    yield db_obj
+        finally:
+            await result.close()
+
+    async def get_open_queue(
+        self, session: AsyncSession, pool: Optional[str] = None
+    ):
+        """Снимок очереди открытых объектов пула: списки id и остатков."""
+        rows = await session.execute(
+            select(
+                self.model.id,
+                self.model.full_amount - self.model.invested_amount,
+            )
+            .where(utils.open_rows(self.model, pool))
+            .order_by(asc(self.model.create_date), asc(self.model.id))
+        )
+        rows = rows.all()
+        return [row[0] for row in rows], [row[1] for row in rows]
 
     async def create(
         self, obj_in, session: AsyncSession, user: Optional[User] = None
     ):
-        """Создание объекта."""
+        """Создание объекта одним INSERT без перечитывания.
+
+        Возвращается объект, не привязанный к сессии: его поля - значения
+        INSERT вместе со значениями по умолчанию и id из lastrowid.
+        """
         obj_in_data = obj_in.dict()
 
         obj_in_data["create_date"] = utils.get_current_time()
@@ -47,10 +163,60 @@ class CRUDBase:
         if user is not None:
             obj_in_data["user_id"] = user.id
 
-        db_obj = self.model(**obj_in_data)
-        session.add(db_obj)
+        result = await session.execute(insert(self.model).values(obj_in_data))
         await session.commit()
-        await session.refresh(db_obj)
+        await read_cache.invalidate(self.model.__tablename__)
+        return self.model(
+            **result.last_inserted_params(),
+            id=result.inserted_primary_key[0],
+        )
+
+    async def create_multi(
+        self, objs_in, session: AsyncSession, user: Optional[User] = None
+    ) -> range:
+        """Создание списка объектов одним пакетным INSERT.
+
+        Все объекты получают одну дату создания. Возвращаются id
+        созданных объектов - для их последующей выборки.
+        """
+        create_date = utils.get_current_time()
+        rows = []
+        for obj_in in objs_in:
+            obj_in_data = obj_in.dict()
+            obj_in_data["create_date"] = create_date
+            if user is not None:
+                obj_in_data["user_id"] = user.id
+            rows.append(obj_in_data)
+        await session.execute(insert(self.model), rows)
+        # Пакетный INSERT не возвращает id строк. Транзакция удерживает
+        # блокировку записи с момента INSERT, и id выдаются подряд, поэтому
+        # пакет занимает последние len(rows) id таблицы
+        last_id = await session.scalar(select(func.max(self.model.id)))
+        await session.commit()
+        await read_cache.invalidate(self.model.__tablename__)
+        return range(last_id - len(rows) + 1, last_id + 1)
+
+    async def get_created(self, obj_ids: range, session: AsyncSession):
+        """Получение объектов, созданных одним вызовом create_multi."""
+        db_objs = await session.execute(
+            select(self.model)
+            .where(self.model.id.between(obj_ids.start, obj_ids.stop - 1))
+            .order_by(asc(self.model.id))
+        )
+        return db_objs.scalars().all()
+
+    async def save(self, db_obj, session: AsyncSession):
+        """Запись изменений объекта одним UPDATE без перечитывания.
+
+        Объект отсоединяется от сессии до фиксации и сохраняет записанное
+        состояние (включая новую версию строки) при expire_on_commit.
+        Объект, изменённый после загрузки, не записывается - ошибка 409.
+        """
+        async with utils.stale_version_conflicts(session):
+            await session.flush()
+        session.expunge(db_obj)
+        await session.commit()
+        await read_cache.invalidate(self.model.__tablename__)
         return db_obj
 
     async def update(
@@ -60,17 +226,9 @@ class CRUDBase:
         session: AsyncSession,
     ):
         """Редактирование объекта."""
-        obj_data = jsonable_encoder(db_obj)
-
-        update_data = obj_in.dict(exclude_unset=True)
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
-        return db_obj
+        for field, value in obj_in.dict(exclude_unset=True).items():
+            setattr(db_obj, field, value)
+        return await self.save(db_obj, session)
 
     async def remove(
         self,
@@ -79,5 +237,7 @@ class CRUDBase:
     ):
         """Удаление объекта."""
         await session.delete(db_obj)
-        await session.commit()
+        async with utils.stale_version_conflicts(session):
+            await session.commit()
+        await read_cache.invalidate(self.model.__tablename__)
         return db_obj
@@ -7,17 +7,16 @@ from app.models.charity_project import CharityProject
 
 
 class CRUDProject(CRUDBase):
-    async def get_project_by_name(
+    async def get_existing_names(
         self,
-        name: str,
+        names: list[str],
         session: AsyncSession,
-    ):
-        """Получение проекта по его имени."""
-        db_obj = await session.execute(
-            select(self.model).where(self.model.name == name)
+    ) -> list[str]:
+        """Имена из списка, уже занятые проектами."""
+        db_names = await session.execute(
+            select(self.model.name).where(self.model.name.in_(names))
         )
-        db_obj = db_obj.scalars().first()
-        return db_obj
+        return db_names.scalars().all()
 
     async def close_project(
         self,
@@ -26,11 +25,8 @@ class CRUDProject(CRUDBase):
     ):
         """Закрытие проекта - установка даты закрытия."""
         if db_obj.close_date is None:
-            print(db_obj.close_date)
             setattr(db_obj, "close_date", utils.get_current_time())
-            session.add(db_obj)
-            await session.commit()
-            await session.refresh(db_obj)
+            await self.save(db_obj, session)
 
     async def get_projects_by_completion_rate(
         self, session: AsyncSession
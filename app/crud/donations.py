@@ -1,9 +1,21 @@
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.crud.base import CRUDBase
 from app.models.donation import Donation
 
 
 class CRUDProject(CRUDBase):
-    pass
+    async def get_last_id(
+        self, session: AsyncSession, pool: Optional[str] = None
+    ) -> Optional[int]:
+        """Наибольший id пожертвования пула (None - общий пул)."""
+        last_id = await session.execute(
+            select(func.max(self.model.id)).where(self.model.pool == pool)
+        )
+        return last_id.scalar()
 
 
 crud_donations = CRUDProject(Donation)
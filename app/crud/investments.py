@@ -0,0 +1,36 @@
+from sqlalchemy import asc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models.investment import Investment
+
+
+class CRUDInvestment(CRUDBase):
+    async def get_by_project(
+        self,
+        project_id: int,
+        session: AsyncSession,
+    ):
+        """Поступления в проект по индексу project_id."""
+        db_objs = await session.execute(
+            select(self.model)
+            .where(self.model.project_id == project_id)
+            .order_by(asc(self.model.id))
+        )
+        return db_objs.scalars().all()
+
+    async def get_by_donation(
+        self,
+        donation_id: int,
+        session: AsyncSession,
+    ):
+        """Распределение пожертвования по индексу donation_id."""
+        db_objs = await session.execute(
+            select(self.model)
+            .where(self.model.donation_id == donation_id)
+            .order_by(asc(self.model.id))
+        )
+        return db_objs.scalars().all()
+
+
+crud_investments = CRUDInvestment(Investment)
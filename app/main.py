@@ -2,7 +2,13 @@ from fastapi import FastAPI
 
 from app.api.routers import main_router
 from app.core.config import settings
+from app.services.rebalance import rebalance_worker
 
 app = FastAPI(title=settings.app_title)
 
 app.include_router(main_router)
+
+
+@app.on_event("shutdown")
+async def stop_rebalance_worker():
+    await rebalance_worker.stop()
@@ -1,3 +1,6 @@
 from .charity_project import CharityProject  # noqa
+from .data_version import DataVersion  # noqa
 from .donation import Donation  # noqa
+from .investment import Investment  # noqa
+from .queue_total import QueueTotal  # noqa
 from .user import User  # noqa
@@ -1,14 +1,82 @@
-from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, Integer
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
 
 class CustomBase(Base):
     __abstract__ = True
-    __table_args__ = (CheckConstraint("full_amount >= invested_amount >= 0"),)
+    # Дополнительные индексы таблицы-наследника
+    _indexes = ()
 
     full_amount = Column(Integer)
     invested_amount = Column(Integer, default=0)
     fully_invested = Column(Boolean, nullable=False, default=False)
     create_date = Column(DateTime, nullable=False)
     close_date = Column(DateTime)
+    # Версия строки для оптимистичной блокировки
+    version = Column(Integer, nullable=False, server_default="1")
+    # Пул финансирования: распределение идёт только внутри пула,
+    # None - общий пул
+    pool = Column(String(100))
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            CheckConstraint("full_amount >= invested_amount >= 0"),
+            # Очередь распределения: открытые объекты пула в порядке
+            # создания. Индекс покрывающий - остатки читаются без обращения
+            # к таблице (close_date включена, иначе SQLite читает строку)
+            Index(
+                f"ix_{cls.__tablename__}_open_queue",
+                "pool",
+                "create_date",
+                "id",
+                "full_amount",
+                "invested_amount",
+                "version",
+                "close_date",
+                sqlite_where=text("close_date IS NULL"),
+                postgresql_where=text("close_date IS NULL"),
+            ),
+            # Списки объектов пула
+            Index(f"ix_{cls.__tablename__}_pool", "pool", "create_date", "id"),
+            # Постраничные списки в порядке создания
+            Index(f"ix_{cls.__tablename__}_created", "create_date", "id"),
+            # Фильтры списков (app.api.filters)
+            Index(
+                f"ix_{cls.__tablename__}_open_created",
+                "create_date",
+                "id",
+                sqlite_where=text("close_date IS NULL"),
+                postgresql_where=text("close_date IS NULL"),
+            ),
+            Index(
+                f"ix_{cls.__tablename__}_closed_created",
+                "create_date",
+                "id",
+                sqlite_where=text("close_date IS NOT NULL"),
+                postgresql_where=text("close_date IS NOT NULL"),
+            ),
+            Index(
+                f"ix_{cls.__tablename__}_invested_created",
+                "fully_invested",
+                "create_date",
+                "id",
+            ),
+            Index(f"ix_{cls.__tablename__}_amount", "full_amount"),
+            *cls._indexes,
+        )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.version}
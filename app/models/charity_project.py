@@ -1,10 +1,59 @@
-from sqlalchemy import CheckConstraint, Column, String, Text
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 
 from .base import CustomBase
 
 
 class CharityProject(CustomBase):
+    _indexes = (
+        # Отчёт по закрытым проектам
+        Index(
+            "ix_charityproject_closed",
+            "close_date",
+            "create_date",
+            sqlite_where=text("close_date IS NOT NULL"),
+            postgresql_where=text("close_date IS NOT NULL"),
+        ),
+        # Очереди стратегий "closest" и "priority"
+        Index(
+            "ix_charityproject_closest_queue",
+            "pool",
+            text("(full_amount - invested_amount)"),
+            "create_date",
+            "id",
+            "full_amount",
+            "invested_amount",
+            "version",
+            "close_date",
+            sqlite_where=text("close_date IS NULL"),
+            postgresql_where=text("close_date IS NULL"),
+        ),
+        Index(
+            "ix_charityproject_priority_queue",
+            "pool",
+            text("(-priority)"),
+            "create_date",
+            "id",
+            "full_amount",
+            "invested_amount",
+            "version",
+            "priority",
+            "close_date",
+            sqlite_where=text("close_date IS NULL"),
+            postgresql_where=text("close_date IS NULL"),
+        ),
+    )
+
     name = Column(String(100), unique=True, nullable=False)
     description = Column(
         Text, CheckConstraint("LENGTH(description) >= 1"), nullable=False
     )
+    # Приоритет для стратегии "priority": больший финансируется раньше
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
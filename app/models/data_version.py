@@ -0,0 +1,44 @@
+from sqlalchemy import DDL, Column, Integer, String, event
+
+from app.core.db import Base
+
+# Таблицы, изменения которых отслеживаются счётчиком версии
+VERSIONED = ("charityproject",)
+
+TRIGGERS = tuple(
+    f"CREATE TRIGGER {{table}}_version_{action} AFTER {action.upper()} "
+    "ON {table} BEGIN UPDATE dataversion SET version = version + 1 "
+    "WHERE name = '{table}'; END"
+    for action in ("insert", "update", "delete")
+)
+
+
+class DataVersion(Base):
+    """Счётчик версии данных таблицы для условных запросов.
+
+    Счётчик увеличивается триггерами SQLite в той же транзакции, что и
+    любое изменение строк таблицы, включая проходы распределения.
+    """
+
+    name = Column(String(100), nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=1)
+
+
+def data_version_ddl(table: str) -> list[str]:
+    """Начальная версия таблицы и триггеры для её увеличения."""
+    return [
+        f"INSERT INTO dataversion (name, version) VALUES ('{table}', 1)",
+        *(trigger.format(table=table) for trigger in TRIGGERS),
+    ]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_data_versions(target, connection, tables=(), **kw):
+    """Версии и триггеры создаются после отслеживаемых таблиц."""
+    if connection.dialect.name != "sqlite":
+        return
+    if DataVersion.__table__ not in tables:
+        return
+    for table in VERSIONED:
+        for statement in data_version_ddl(table):
+            connection.execute(DDL(statement))
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import Column, ForeignKey, Index, Integer, Text
 
 # Импортируем базовый класс для моделей.
 from app.models.charity_project import CustomBase
 
 
 class Donation(CustomBase):
+    _indexes = (
+        # Пожертвования пользователя (/donation/my) в порядке создания
+        Index("ix_donation_user", "user_id", "create_date", "id"),
+    )
+
     comment = Column(Text)
     user_id = Column(Integer, ForeignKey("user.id"))
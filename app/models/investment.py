@@ -0,0 +1,18 @@
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    """Перевод средств из пожертвования в проект."""
+
+    __table_args__ = (CheckConstraint("amount > 0"),)
+
+    donation_id = Column(
+        Integer, ForeignKey("donation.id"), nullable=False, index=True
+    )
+    project_id = Column(
+        Integer, ForeignKey("charityproject.id"), nullable=False, index=True
+    )
+    amount = Column(Integer, nullable=False)
+    create_date = Column(DateTime, nullable=False)
@@ -0,0 +1,111 @@
+from sqlalchemy import (
+    DDL,
+    Column,
+    Integer,
+    String,
+    UniqueConstraint,
+    event,
+)
+
+from app.core.db import Base
+
+# Таблицы очередей, для которых ведутся итоги
+QUEUES = ("charityproject", "donation")
+
+# Остаток открытой строки очереди
+REST = (
+    "CASE WHEN {row}.close_date IS NULL "
+    "THEN COALESCE({row}.full_amount, 0) "
+    "- COALESCE({row}.invested_amount, 0) "
+    "ELSE 0 END"
+)
+
+# Итоги общего пула (pool IS NULL) хранятся под пустым именем
+POOL = "COALESCE({row}.pool, '')"
+
+# Строки итогов пула создаются для обеих очередей при первом объекте пула
+ENSURE_POOL = (
+    "INSERT OR IGNORE INTO queuetotal (queue, pool, amount) VALUES {values}; "
+)
+
+TRIGGERS = (
+    "CREATE TRIGGER {queue}_total_insert AFTER INSERT ON {queue} BEGIN "
+    "{ensure_pool}UPDATE queuetotal SET amount = amount + {new_rest} "
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    "CREATE TRIGGER {queue}_total_update AFTER UPDATE OF "
+    "full_amount, invested_amount, close_date ON {queue} "
+    "WHEN OLD.pool IS NEW.pool "
+    "BEGIN UPDATE queuetotal SET amount = amount + {new_rest} - {old_rest} "
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    # Перенос объекта в другой пул
+    "CREATE TRIGGER {queue}_total_move AFTER UPDATE ON {queue} "
+    "WHEN OLD.pool IS NOT NEW.pool BEGIN "
+    "{ensure_pool}UPDATE queuetotal SET amount = amount - {old_rest} "
+    "WHERE queue = '{queue}' AND pool = {old_pool}; "
+    "UPDATE queuetotal SET amount = amount + {new_rest} "
+    "WHERE queue = '{queue}' AND pool = {new_pool}; END",
+    "CREATE TRIGGER {queue}_total_delete AFTER DELETE ON {queue} "
+    "BEGIN UPDATE queuetotal SET amount = amount - {old_rest} "
+    "WHERE queue = '{queue}' AND pool = {old_pool}; END",
+)
+
+# Пулы, встречающиеся в любой из очередей
+POOLS = " UNION ".join(
+    f"SELECT {POOL.format(row=queue)} AS pool FROM {queue}"
+    for queue in QUEUES
+)
+
+
+class QueueTotal(Base):
+    """Сумма остатков открытых объектов очереди в пуле.
+
+    Итоги поддерживаются триггерами SQLite в той же транзакции,
+    что и любые изменения проектов и пожертвований.
+    """
+
+    __table_args__ = (UniqueConstraint("queue", "pool"),)
+
+    queue = Column(String(100), nullable=False)
+    # Пул; общий пул - пустая строка
+    pool = Column(String(100), nullable=False, default="", server_default="")
+    amount = Column(Integer, nullable=False, default=0)
+
+
+def queue_total_ddl(queue: str) -> list[str]:
+    """Заполнение итогов очереди и триггеры для их поддержки."""
+    new_pool = POOL.format(row="NEW")
+    ensure_pool = ENSURE_POOL.format(
+        values=", ".join(f"('{name}', {new_pool}, 0)" for name in QUEUES)
+    )
+    return [
+        (
+            "INSERT INTO queuetotal (queue, pool, amount) "
+            f"SELECT '{queue}', pools.pool, COALESCE(("
+            f"SELECT SUM({REST.format(row=queue)}) FROM {queue} "
+            f"WHERE {POOL.format(row=queue)} = pools.pool), 0) "
+            f"FROM ({POOLS}) AS pools"
+        ),
+        *(
+            trigger.format(
+                queue=queue,
+                new_rest=REST.format(row="NEW"),
+                old_rest=REST.format(row="OLD"),
+                new_pool=new_pool,
+                old_pool=POOL.format(row="OLD"),
+                ensure_pool=ensure_pool,
+            )
+            for trigger in TRIGGERS
+        ),
+    ]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_queue_totals(target, connection, tables=(), **kw):
+    """Итоги и триггеры создаются после всех таблиц очередей."""
+    if connection.dialect.name != "sqlite":
+        return
+    if QueueTotal.__table__ not in tables:
+        return
+    for queue in QUEUES:
+        for statement in queue_total_ddl(queue):
+            connection.execute(DDL(statement))
@@ -0,0 +1,34 @@
+from typing import Literal
+
+from pydantic import BaseModel, Extra, Field, conlist
+
+from app.core.config import settings
+
+
+class SimulationEvent(BaseModel):
+    type: Literal["project", "donation"]
+    full_amount: int = Field(..., gt=0)
+
+    class Config:
+        extra = Extra.forbid
+
+
+SimulationEvents = conlist(
+    SimulationEvent, min_items=1, max_items=settings.bulk_max_items
+)
+
+
+class TransferDB(BaseModel):
+    donation_id: int
+    project_id: int
+    amount: int
+
+
+class SimulationStepDB(BaseModel):
+    type: str
+    id: int
+    full_amount: int
+    invested_amount: int
+    closed_project_ids: list[int]
+    closed_donation_ids: list[int]
+    transfers: list[TransferDB]
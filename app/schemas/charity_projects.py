@@ -1,19 +1,30 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Extra, Field
+from pydantic import BaseModel, Extra, Field, conlist, validator
+
+from app.core.config import settings
 
 
 class ProjectCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: str = Field(..., min_length=1)
     full_amount: int = Field(..., gt=0)
+    # Приоритет для стратегии распределения "priority"
+    priority: int = 0
+    # Пул финансирования; без пула - общий пул
+    pool: Optional[str] = Field(None, min_length=1, max_length=100)
 
     class Config:
         extra = Extra.forbid
 
 
-class ProjectUpdate(BaseModel):
+ProjectBulkCreate = conlist(
+    ProjectCreate, min_items=1, max_items=settings.bulk_max_items
+)
+
+
+class ProjectBase(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, min_length=1)
     full_amount: Optional[int] = Field(None, gt=0)
@@ -22,7 +33,18 @@ class ProjectUpdate(BaseModel):
         extra = Extra.forbid
 
 
-class ProjectDB(ProjectUpdate):
+class ProjectUpdate(ProjectBase):
+    priority: Optional[int]
+
+    @validator("priority", pre=True)
+    def priority_not_null(cls, value):
+        """Приоритет можно не передавать, но нельзя сбросить в null."""
+        if value is None:
+            raise ValueError("Приоритет не может быть пустым!")
+        return value
+
+
+class ProjectDB(ProjectBase):
     id: int
     invested_amount: int
     fully_invested: bool
@@ -1,17 +1,26 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Extra, Field
+from pydantic import BaseModel, Extra, Field, conlist
+
+from app.core.config import settings
 
 
 class DonationCreate(BaseModel):
     full_amount: int = Field(..., gt=0)
     comment: Optional[str]
+    # Пул финансирования; без пула - общий пул
+    pool: Optional[str] = Field(None, min_length=1, max_length=100)
 
     class Config:
         extra = Extra.forbid
 
 
+DonationBulkCreate = conlist(
+    DonationCreate, min_items=1, max_items=settings.bulk_max_items
+)
+
+
 class DonationShortDB(DonationCreate):
     id: int
     create_date: Optional[datetime]
@@ -29,3 +38,22 @@ class DonationFulltDB(DonationShortDB):
 
     class Config:
         orm_mode = True
+
+
+class DonationStatus(BaseModel):
+    id: int
+    invested_amount: int
+    fully_invested: bool
+    # Пожертвование прошло распределение. При фоновом распределении -
+    # по сведениям обработчика процесса, ответившего на запрос: после
+    # перезапуска или в другом процессе - false до прохода пула
+    allocated: bool
+
+
+class DonationBulkDB(BaseModel):
+    id: int
+    invested_amount: int
+    fully_invested: bool
+
+    class Config:
+        orm_mode = True
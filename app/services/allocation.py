@@ -0,0 +1,234 @@
+"""Распределение пожертвований по проектам без обращения к БД.
+
+Очереди передаются компактными последовательностями id и остатков
+(full_amount - invested_amount) в порядке распределения. Граница
+распределения находится двоичным поиском по нарастающим итогам,
+поэтому расчёт не зависит от ORM и пригоден для моделирования.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import accumulate
+from typing import Optional, Sequence
+
+# Типы объектов гипотетических событий моделирования
+PROJECT = "project"
+DONATION = "donation"
+
+
+@dataclass
+class QueuePlan:
+    """Результат распределения для одной очереди."""
+
+    # id объектов, инвестированных полностью (префикс очереди)
+    closed_ids: Sequence[int] = field(default_factory=list)
+    # id частично инвестированного объекта на границе
+    boundary_id: Optional[int] = None
+    # Сумма, зачисляемая в объект на границе
+    boundary_delta: int = 0
+    # Зачисления (id, сумма) вне префикса - для планов с prefix=False
+    deltas: list = field(default_factory=list)
+    # Закрываемые объекты образуют префикс очереди
+    prefix: bool = True
+
+
+@dataclass
+class AllocationPlan:
+    """Результат распределения для обеих очередей."""
+
+    projects: QueuePlan
+    donations: QueuePlan
+    # Переводы (donation_id, project_id, amount)
+    transfers: list = field(default_factory=list)
+    # Общая распределённая сумма
+    total: int = 0
+    # Время прохода - дата закрытия объектов
+    date: Optional[datetime] = None
+
+    def project_invested(self, project_id: int) -> int:
+        """Сумма, зачисленная проходом в проект."""
+        return sum(
+            amount
+            for _, transfer_project_id, amount in self.transfers
+            if transfer_project_id == project_id
+        )
+
+
+def plan_queue(
+    ids: Sequence[int], cumulative: Sequence[int], total: int
+) -> QueuePlan:
+    """Граница очереди при распределении суммы total."""
+    closed = bisect_right(cumulative, total)
+    plan = QueuePlan(closed_ids=ids[:closed])
+    invested = cumulative[closed - 1] if closed else 0
+    if closed < len(ids) and total > invested:
+        plan.boundary_id = ids[closed]
+        plan.boundary_delta = total - invested
+    return plan
+
+
+def plan_transfers(
+    project_ids: Sequence[int],
+    project_cumulative: Sequence[int],
+    donation_ids: Sequence[int],
+    donation_cumulative: Sequence[int],
+    total: int,
+    position: int = 0,
+) -> list:
+    """Переводы между очередями - слияние нарастающих итогов.
+
+    Возвращаются переводы на участке от position до total.
+    """
+    transfers = []
+    project = bisect_right(project_cumulative, position)
+    donation = bisect_right(donation_cumulative, position)
+    while position < total:
+        end = min(
+            project_cumulative[project], donation_cumulative[donation], total
+        )
+        if end > position:
+            transfers.append(
+                (donation_ids[donation], project_ids[project], end - position)
+            )
+            position = end
+        if project_cumulative[project] == end:
+            project += 1
+        if donation_cumulative[donation] == end:
+            donation += 1
+    return transfers
+
+
+def credited(
+    ids: Sequence[int], rests: Sequence[int], plan: QueuePlan
+) -> list:
+    """Суммы, зачисляемые по плану в каждый объект очереди."""
+    closed = set(plan.closed_ids)
+    deltas = dict(plan.deltas)
+    return [
+        rest if obj_id in closed else deltas.get(obj_id, 0)
+        for obj_id, rest in zip(ids, rests)
+    ]
+
+
+def allocate(
+    project_ids: Sequence[int],
+    project_rests: Sequence[int],
+    donation_ids: Sequence[int],
+    donation_rests: Sequence[int],
+    strategy=None,
+) -> AllocationPlan:
+    """Распределение пожертвований по проектам в порядке очередей.
+
+    strategy - стратегия распределения по очереди проектов
+    (app.services.strategies), по умолчанию - в порядке очереди.
+    """
+    project_cumulative = list(accumulate(project_rests))
+    donation_cumulative = list(accumulate(donation_rests))
+    total = min(
+        project_cumulative[-1] if project_cumulative else 0,
+        donation_cumulative[-1] if donation_cumulative else 0,
+    )
+    if strategy is None:
+        projects = plan_queue(project_ids, project_cumulative, total)
+    else:
+        projects = strategy.plan(
+            project_ids, project_rests, project_cumulative, total
+        )
+    if not projects.prefix:
+        # Переводы считаются по зачисляемым суммам, а не по остаткам
+        project_cumulative = list(
+            accumulate(credited(project_ids, project_rests, projects))
+        )
+    return AllocationPlan(
+        projects=projects,
+        donations=plan_queue(donation_ids, donation_cumulative, total),
+        transfers=plan_transfers(
+            project_ids,
+            project_cumulative,
+            donation_ids,
+            donation_cumulative,
+            total,
+        ),
+        total=total,
+    )
+
+
+@dataclass
+class SimulationStep:
+    """Результат добавления одного гипотетического объекта."""
+
+    type: str
+    # Гипотетические объекты получают отрицательные id: -1, -2, ...
+    id: int
+    full_amount: int
+    invested_amount: int
+    closed_project_ids: Sequence[int]
+    closed_donation_ids: Sequence[int]
+    transfers: list
+
+
+def closed_between(
+    ids: Sequence[int], cumulative: Sequence[int], start: int, end: int
+) -> Sequence[int]:
+    """id объектов, полностью инвестированных на участке (start, end]."""
+    return ids[bisect_right(cumulative, start):bisect_right(cumulative, end)]
+
+
+def simulate(
+    project_ids: Sequence[int],
+    project_rests: Sequence[int],
+    donation_ids: Sequence[int],
+    donation_rests: Sequence[int],
+    events: Sequence[tuple],
+) -> list:
+    """Моделирование распределения при добавлении объектов в очереди.
+
+    Очереди - снимок открытых объектов, events - пары (тип, сумма),
+    добавляемые в конец очередей по порядку. Распределённая сумма
+    после каждого события - минимум из итогов очередей, поэтому шаг
+    требует двоичного поиска и обхода только затронутых объектов.
+    """
+    queues = {
+        PROJECT: (list(project_ids), list(accumulate(project_rests))),
+        DONATION: (list(donation_ids), list(accumulate(donation_rests))),
+    }
+
+    def queue_total(kind):
+        cumulative = queues[kind][1]
+        return cumulative[-1] if cumulative else 0
+
+    # Снимок считается распределённым обычным проходом
+    position = min(queue_total(PROJECT), queue_total(DONATION))
+    steps = []
+    for number, (kind, full_amount) in enumerate(events, 1):
+        ids, cumulative = queues[kind]
+        before = queue_total(kind)
+        ids.append(-number)
+        cumulative.append(before + full_amount)
+        total = min(queue_total(PROJECT), queue_total(DONATION))
+        projects, project_cumulative = queues[PROJECT]
+        donations, donation_cumulative = queues[DONATION]
+        steps.append(
+            SimulationStep(
+                type=kind,
+                id=-number,
+                full_amount=full_amount,
+                invested_amount=min(full_amount, max(0, total - before)),
+                closed_project_ids=closed_between(
+                    projects, project_cumulative, position, total
+                ),
+                closed_donation_ids=closed_between(
+                    donations, donation_cumulative, position, total
+                ),
+                transfers=plan_transfers(
+                    projects,
+                    project_cumulative,
+                    donations,
+                    donation_cumulative,
+                    total,
+                    position,
+                ),
+            )
+        )
+        position = total
+    return steps
@@ -0,0 +1,156 @@
+"""Кэш результатов чтения списков.
+
+Кэшируются строки выборок столбцов (CRUDBase.get_multi с columns) -
+неизменяемые и не привязанные к сессии. Записи группируются по
+пространствам имён (таблицам); запись в таблицу увеличивает поколение
+её пространства, и все прежние записи перестают читаться, а затем
+вытесняются по LRU или TTL. Поколения хранятся в бэкенде, поэтому при
+общем бэкенде (Redis) сброс виден всем процессам.
+
+Одновременные промахи по одному ключу в процессе объединяются: запрос
+в БД выполняет только первый, остальные ждут его результат.
+
+Бэкенд выбирается параметром settings.cache_url: без него - память
+процесса, redis://... - Redis-совместимый сервер (пакет redis).
+settings.cache_ttl = 0 отключает кэш.
+"""
+import asyncio
+import pickle
+from typing import Awaitable, Callable, Optional
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+
+
+class MemoryBackend:
+    """LRU с TTL в памяти процесса."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.data = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generations = {}
+
+    async def get(self, key: str):
+        return self.data.get(key)
+
+    async def set(self, key: str, value):
+        self.data[key] = value
+
+    async def get_generation(self, namespace: str) -> int:
+        return self.generations.get(namespace, 0)
+
+    async def incr_generation(self, namespace: str):
+        self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+    async def clear(self):
+        self.data.clear()
+        self.generations.clear()
+
+
+class RedisBackend:
+    """Redis-совместимый сервер, общий для нескольких процессов.
+
+    Размер ограничивается политикой вытеснения сервера (maxmemory-policy
+    allkeys-lru), записи живут не дольше ttl.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "qrkot:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "Для CACHE_URL=redis://... требуется пакет redis."
+            )
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        value = await self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    async def set(self, key: str, value):
+        await self.client.set(
+            self.prefix + key, pickle.dumps(value), px=int(self.ttl * 1000)
+        )
+
+    async def get_generation(self, namespace: str) -> int:
+        generation = await self.client.get(f"{self.prefix}{namespace}:gen")
+        return int(generation or 0)
+
+    async def incr_generation(self, namespace: str):
+        await self.client.incr(f"{self.prefix}{namespace}:gen")
+
+    async def clear(self):
+        async for key in self.client.scan_iter(f"{self.prefix}*"):
+            await self.client.delete(key)
+
+
+class ReadCache:
+    """Кэш чтения с поколениями пространств имён и single-flight."""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        # Загрузки, выполняющиеся в процессе, по полному ключу
+        self.flights = {}
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        load: Callable[[], Awaitable],
+        version: Optional[int] = None,
+    ):
+        """Значение из кэша или результат load, сохранённый в кэш.
+
+        version - версия данных из БД (DataVersion); при ней поколение
+        берётся из общего для всех процессов счётчика, а не из бэкенда.
+        """
+        if self.backend is None:
+            return await load()
+        if version is not None:
+            generation = f"v{version}"
+        else:
+            generation = await self.backend.get_generation(namespace)
+        full_key = f"{namespace}:{generation}:{key}"
+        value = await self.backend.get(full_key)
+        if value is not None:
+            return value
+        flight = self.flights.get(full_key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(full_key, load))
+            self.flights[full_key] = flight
+            flight.add_done_callback(
+                lambda _: self.flights.pop(full_key, None)
+            )
+        # Отмена одного из ожидающих запросов не прерывает загрузку
+        return await asyncio.shield(flight)
+
+    async def _load(self, full_key: str, load: Callable[[], Awaitable]):
+        value = await load()
+        await self.backend.set(full_key, value)
+        return value
+
+    async def invalidate(self, *namespaces: str):
+        """Сброс записей пространств имён после записи в таблицы."""
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            await self.backend.incr_generation(namespace)
+
+    async def clear(self):
+        if self.backend is not None:
+            await self.backend.clear()
+
+
+def make_backend(url: Optional[str] = None):
+    """Бэкенд кэша по settings.cache_url."""
+    if not settings.cache_ttl:
+        return None
+    url = url or settings.cache_url
+    if url is None:
+        return MemoryBackend(settings.cache_maxsize, settings.cache_ttl)
+    return RedisBackend(url, settings.cache_ttl)
+
+
+read_cache = ReadCache(make_backend())
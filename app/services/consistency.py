@@ -0,0 +1,298 @@
+"""Проверка и восстановление состояния инвестирования.
+
+Каноническое состояние - результат распределения FIFO проектов
+и пожертвований каждого пула в порядке (create_date, id). Потребность проекта -
+full_amount; для проекта, закрытого вручную до полного инвестирования,
+- зачисленная к моменту закрытия сумма. Распределённая сумма равна
+минимуму из итогов потребностей и пожертвований, поэтому ожидаемое
+состояние каждой строки вычисляется за один проход по очереди.
+
+Проверку с исправлением следует выполнять при остановленном приёме
+пожертвований и проектов.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import (
+    and_,
+    asc,
+    bindparam,
+    case,
+    func,
+    or_,
+    select,
+    union,
+    update,
+)
+
+from app.api.utils import get_current_time
+from app.models import CharityProject, Donation
+
+# Размер пакета строк по умолчанию
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class Mismatch:
+    """Расхождение фактического состояния строки с каноническим."""
+
+    table: str
+    id: int
+    invested_amount: int
+    expected_invested_amount: int
+    fully_invested: bool
+    expected_fully_invested: bool
+    closed: bool
+    expected_closed: bool
+
+    def __str__(self):
+        return (
+            f"{self.table} {self.id}: invested_amount "
+            f"{self.invested_amount} -> {self.expected_invested_amount}, "
+            f"fully_invested {self.fully_invested} -> "
+            f"{self.expected_fully_invested}, closed {self.closed} -> "
+            f"{self.expected_closed}"
+        )
+
+
+@dataclass
+class ConsistencyReport:
+    """Итоги проверки."""
+
+    checked: int = 0
+    mismatches: int = 0
+    fixed: int = 0
+
+
+def project_demand(model):
+    """Выражение потребности проекта в финансировании."""
+    return case(
+        (
+            or_(model.close_date.is_(None), model.fully_invested.is_(True)),
+            model.full_amount,
+        ),
+        else_=model.invested_amount,
+    )
+
+
+def donation_demand(model):
+    """Выражение суммы пожертвования, доступной для распределения."""
+    return model.full_amount
+
+
+class Checkpoint:
+    """Состояние проверки, сохраняемое в файл после каждого пакета."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.state = {}
+        if path is not None and path.exists():
+            self.state = json.loads(path.read_text())
+
+    def save(self):
+        if self.path is not None:
+            self.path.write_text(json.dumps(self.state))
+
+    def clear(self):
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+
+
+async def get_pools(session) -> list:
+    """Пулы, встречающиеся в проектах и пожертвованиях."""
+    pools = await session.execute(
+        union(
+            select(CharityProject.pool).distinct(),
+            select(Donation.pool).distinct(),
+        )
+    )
+    return pools.scalars().all()
+
+
+async def get_total(session, pool: Optional[str] = None) -> int:
+    """Каноническая распределённая сумма пула."""
+    totals = []
+    for model, demand in (
+        (CharityProject, project_demand),
+        (Donation, donation_demand),
+    ):
+        total = await session.execute(
+            select(func.coalesce(func.sum(demand(model)), 0)).where(
+                model.pool == pool
+            )
+        )
+        totals.append(total.scalar())
+    return min(totals)
+
+
+class ConsistencyChecker:
+    """Потоковая проверка очередей пакетами по chunk_size строк."""
+
+    def __init__(
+        self,
+        session_factory,
+        fix: bool,
+        chunk_size: int,
+        checkpoint: Checkpoint,
+        output: Callable,
+    ):
+        self.session_factory = session_factory
+        self.fix = fix
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.output = output
+        self.report = ConsistencyReport()
+
+    async def run(self) -> ConsistencyReport:
+        state = self.checkpoint.state
+        if "pools" not in state:
+            async with self.session_factory() as session:
+                # Общий пул хранится под пустым именем
+                state["pools"] = {
+                    pool or "": {"total": await get_total(session, pool)}
+                    for pool in await get_pools(session)
+                }
+        for name, pool_state in state["pools"].items():
+            for model, demand in (
+                (CharityProject, project_demand),
+                (Donation, donation_demand),
+            ):
+                await self.check_table(
+                    model,
+                    demand,
+                    name or None,
+                    pool_state["total"],
+                    pool_state.setdefault(model.__tablename__, {}),
+                )
+        self.checkpoint.clear()
+        return self.report
+
+    async def check_table(
+        self, model, demand, pool: Optional[str], total: int, state: dict
+    ):
+        """Проверка очереди пула с продолжением с сохранённой позиции."""
+        while not state.get("done"):
+            query = (
+                select(
+                    model.id,
+                    model.create_date,
+                    model.full_amount,
+                    model.invested_amount,
+                    model.fully_invested,
+                    model.close_date,
+                    demand(model).label("demand"),
+                )
+                .where(model.pool == pool)
+                .order_by(asc(model.create_date), asc(model.id))
+                .limit(self.chunk_size)
+            )
+            if "id" in state:
+                create_date = datetime.fromisoformat(state["create_date"])
+                query = query.where(
+                    or_(
+                        model.create_date > create_date,
+                        and_(
+                            model.create_date == create_date,
+                            model.id > state["id"],
+                        ),
+                    )
+                )
+            async with self.session_factory() as session:
+                rows = (await session.execute(query)).all()
+                fixes = self.check_rows(
+                    model.__tablename__, rows, total, state
+                )
+                if self.fix and fixes:
+                    await self.apply(session, model.__table__, fixes)
+            self.report.checked += len(rows)
+            if len(rows) < self.chunk_size:
+                state["done"] = True
+            if rows:
+                state["create_date"] = rows[-1].create_date.isoformat()
+                state["id"] = rows[-1].id
+            self.checkpoint.save()
+
+    def check_rows(self, table: str, rows, total: int, state: dict) -> list:
+        """Сравнение пакета строк с каноническим состоянием."""
+        now = get_current_time()
+        fixes = []
+        for row in rows:
+            position = state.get("position", 0)
+            state["position"] = position + row.demand
+            expected = min(row.demand, max(0, total - position))
+            expected_fully = expected == row.full_amount
+            # Закрытый вручную проект остаётся закрытым
+            expected_closed = expected_fully or row.demand < row.full_amount
+            closed = row.close_date is not None
+            if (row.invested_amount, row.fully_invested, closed) == (
+                expected, expected_fully, expected_closed
+            ):
+                continue
+            self.report.mismatches += 1
+            self.output(
+                str(
+                    Mismatch(
+                        table=table,
+                        id=row.id,
+                        invested_amount=row.invested_amount,
+                        expected_invested_amount=expected,
+                        fully_invested=row.fully_invested,
+                        expected_fully_invested=expected_fully,
+                        closed=closed,
+                        expected_closed=expected_closed,
+                    )
+                )
+            )
+            fixes.append(
+                {
+                    "row_id": row.id,
+                    "row_invested_amount": expected,
+                    "row_fully_invested": expected_fully,
+                    "row_close_date": (
+                        (row.close_date or now) if expected_closed else None
+                    ),
+                }
+            )
+        return fixes
+
+    async def apply(self, session, table, fixes: list):
+        """Исправление пакета строк в одной транзакции."""
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(
+                invested_amount=bindparam("row_invested_amount"),
+                fully_invested=bindparam("row_fully_invested"),
+                close_date=bindparam("row_close_date"),
+                version=table.c.version + 1,
+            ),
+            fixes,
+        )
+        await session.commit()
+        self.report.fixed += len(fixes)
+
+
+async def check_consistency(
+    session_factory,
+    fix: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    checkpoint_path: Optional[Path] = None,
+    output: Callable = print,
+) -> ConsistencyReport:
+    """Проверка (и при fix=True исправление) сумм инвестирования.
+
+    При указании checkpoint_path прогресс сохраняется после каждого
+    пакета, и прерванная проверка продолжается с места остановки.
+    Журнал инвестиций не проверяется.
+    """
+    checker = ConsistencyChecker(
+        session_factory,
+        fix,
+        chunk_size,
+        Checkpoint(checkpoint_path),
+        output,
+    )
+    return await checker.run()
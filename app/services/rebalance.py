@@ -0,0 +1,111 @@
+"""Фоновое распределение пожертвований.
+
+При settings.invest_in_background эндпоинты не ждут распределения,
+а только сигнализируют о необходимости нового прохода. Сигналы,
+поступившие в течение settings.invest_window секунд, объединяются
+в один проход invest_it для каждого затронутого пула; проходы
+разных пулов выполняются параллельно в отдельных сессиях.
+Обработчик работает внутри процесса, и сведения о выполненных проходах
+(признак allocated в состоянии пожертвования) есть только у процесса,
+выполнившего проход: после перезапуска и в других процессах
+пожертвование считается необработанным до следующего прохода пула.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.utils import invest_it
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.crud.donations import crud_donations
+from app.services.allocation import AllocationPlan
+
+
+class RebalanceWorker:
+    """Обработчик, выполняющий проходы распределения по сигналам."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.event = None
+        self.task = None
+        # Пулы, ожидающие прохода распределения
+        self.pending = set()
+        # Наибольший id пожертвования пула, зафиксированного до начала
+        # последнего завершённого прохода: все пожертвования пула с
+        # id не больше этого уже прошли распределение
+        self.allocated_ids = {}
+
+    def notify(self, pool: Optional[str] = None):
+        """Сигнал о необходимости прохода распределения пула."""
+        if self.task is None or self.task.done():
+            self.event = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+        self.pending.add(pool)
+        self.event.set()
+
+    async def stop(self):
+        """Остановка обработчика."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def is_allocated(self, pool: Optional[str], donation_id: int) -> bool:
+        """Прошло ли пожертвование пула распределение в этом процессе."""
+        allocated_id = self.allocated_ids.get(pool)
+        return allocated_id is not None and donation_id <= allocated_id
+
+    async def _invest(self, pool: Optional[str]):
+        """Проход распределения пула в отдельной сессии.
+
+        Граница обработанных пожертвований читается до прохода: id
+        выдаются при вставке, поэтому пожертвование, зафиксированное
+        позже (даже с более ранней датой создания), получит больший id.
+        """
+        try:
+            async with self.session_factory() as session:
+                last_id = await crud_donations.get_last_id(session, pool)
+                plan = await invest_it(session, pool)
+        except Exception:
+            logging.exception(f"Ошибка фонового распределения пула {pool}.")
+            return
+        if plan is None:
+            # Конфликт не разрешился - нужен ещё один проход
+            self.notify(pool)
+        elif last_id is not None:
+            self.allocated_ids[pool] = last_id
+
+    async def _run(self):
+        while True:
+            await self.event.wait()
+            # Сигналы, поступившие за время ожидания, объединяются
+            await asyncio.sleep(settings.invest_window)
+            self.event.clear()
+            pools, self.pending = self.pending, set()
+            await asyncio.gather(*(self._invest(pool) for pool in pools))
+
+
+rebalance_worker = RebalanceWorker(AsyncSessionLocal)
+
+
+async def request_investment(
+    session: AsyncSession,
+    pool: Optional[str] = None,
+) -> Optional[AllocationPlan]:
+    """Распределение пула сразу или через фоновый обработчик."""
+    if settings.invest_in_background:
+        rebalance_worker.notify(pool)
+        return None
+    return await invest_it(session, pool)
+
+
+def is_allocated(donation) -> bool:
+    """Обработано ли пожертвование распределением."""
+    if not settings.invest_in_background or donation.fully_invested:
+        return True
+    return rebalance_worker.is_allocated(donation.pool, donation.id)
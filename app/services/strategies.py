@@ -0,0 +1,104 @@
+"""Стратегии распределения пожертвований по проектам.
+
+Стратегия задаёт порядок очереди открытых проектов и распределение
+суммы по ней; пожертвования всегда расходуются в порядке создания.
+Стратегия выбирается параметром settings.invest_strategy:
+    fifo         - проекты в порядке создания;
+    closest      - первыми проекты, которым осталось собрать меньше всего;
+    priority     - первыми проекты с большим priority (задаёт суперюзер);
+    proportional - сумма делится между всеми открытыми проектами
+                   пропорционально недостающим суммам.
+
+Порядок упорядоченных стратегий поддерживается частичными индексами
+по ключу сортировки, поэтому проход читает только k затронутых строк
+за O(k log n). Пропорциональная стратегия затрагивает все открытые
+проекты.
+"""
+import heapq
+from typing import Sequence
+
+from app.core.config import settings
+from app.services.allocation import QueuePlan, plan_queue
+
+
+class FifoStrategy:
+    """Проекты в порядке создания."""
+
+    # План закрывает префикс очереди - достаточно загрузить префикс
+    prefix = True
+
+    def order_by(self, model) -> tuple:
+        """Ключ сортировки очереди (все выражения по возрастанию)."""
+        return (model.create_date, model.id)
+
+    def plan(
+        self,
+        ids: Sequence[int],
+        rests: Sequence[int],
+        cumulative: Sequence[int],
+        total: int,
+    ) -> QueuePlan:
+        """Распределение суммы total по очереди."""
+        return plan_queue(ids, cumulative, total)
+
+
+class ClosestStrategy(FifoStrategy):
+    """Первыми финансируются проекты, которым осталось собрать меньше."""
+
+    def order_by(self, model) -> tuple:
+        return (
+            model.full_amount - model.invested_amount,
+            model.create_date,
+            model.id,
+        )
+
+
+class PriorityStrategy(FifoStrategy):
+    """Первыми финансируются проекты с большим приоритетом."""
+
+    def order_by(self, model) -> tuple:
+        return (-model.priority, model.create_date, model.id)
+
+
+class ProportionalStrategy(FifoStrategy):
+    """Сумма делится пропорционально недостающим суммам проектов."""
+
+    prefix = False
+
+    def plan(self, ids, rests, cumulative, total) -> QueuePlan:
+        whole = cumulative[-1] if cumulative else 0
+        if total >= whole:
+            return plan_queue(ids, cumulative, total)
+        shares = [rest * total // whole for rest in rests]
+        # Нераспределённый при округлении остаток (меньше числа проектов)
+        # получают по единице проекты с наибольшей дробной частью доли
+        remainder = total - sum(shares)
+        for index in heapq.nlargest(
+            remainder,
+            range(len(rests)),
+            key=lambda index: (rests[index] * total % whole, -index),
+        ):
+            shares[index] += 1
+        plan = QueuePlan(prefix=False)
+        for obj_id, rest, share in zip(ids, rests, shares):
+            if share == rest:
+                plan.closed_ids.append(obj_id)
+            elif share:
+                plan.deltas.append((obj_id, share))
+        return plan
+
+
+STRATEGIES = {
+    "fifo": FifoStrategy(),
+    "closest": ClosestStrategy(),
+    "priority": PriorityStrategy(),
+    "proportional": ProportionalStrategy(),
+}
+
+# Порядок очереди пожертвований
+FIFO = STRATEGIES["fifo"]
+
+
+def get_strategy():
+    """Стратегия распределения для settings.invest_strategy."""
+    return STRATEGIES[settings.invest_strategy]
@@ -0,0 +1,310 @@
+"""Замеры распределения пожертвований на синтетических очередях.
+
+Для каждой комбинации размеров очередей во временной БД SQLite
+создаётся шаблон с открытыми проектами и пожертвованиями; каждый
+прогон выполняется на копии шаблона. Сценарии:
+    backlog     - распределение всей накопленной очереди одним проходом;
+    incremental - после распределения очереди поступает один проект.
+
+Время invest_it измеряется целиком и по этапам: load (итоги и чтение
+очередей), compute (расчёт плана), flush (запись плана и журнала
+инвестиций), commit. Результаты выводятся в JSON.
+
+Запуск:
+    python -m benchmarks.allocation --donations 10000 100000 \
+        --projects 1000 10000 --distribution pareto --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.api.utils as utils
+from app.core.config import settings
+from app.core.db import Base
+from app.models import CharityProject, Donation
+from app.services.strategies import STRATEGIES
+
+SCENARIOS = ("backlog", "incremental")
+PHASES = ("load", "compute", "flush", "commit")
+# Средняя сумма пожертвования
+MEAN_AMOUNT = 1000
+# Размер пакета вставки при заполнении БД
+SEED_CHUNK = 10000
+START_DATE = datetime(2020, 1, 1)
+
+
+def amounts(rng: random.Random, distribution: str, count: int, mean: int):
+    """Суммы с заданным распределением и средним около mean."""
+    for _ in range(count):
+        if distribution == "pareto":
+            # Много мелких сумм и редкие крупные
+            value = rng.paretovariate(1.5) * mean / 3
+        elif distribution == "lognormal":
+            value = rng.lognormvariate(0, 1) * mean / 1.65
+        else:
+            value = rng.uniform(1, 2 * mean)
+        yield max(1, int(value))
+
+
+def seed_rows(model, amount_values, start: int = 0):
+    """Строки открытых объектов в порядке создания."""
+    for number, full_amount in enumerate(amount_values, start):
+        row = {
+            "full_amount": full_amount,
+            "invested_amount": 0,
+            "fully_invested": False,
+            "create_date": START_DATE + timedelta(seconds=number),
+        }
+        if model is CharityProject:
+            row["name"] = f"project-{number}"
+            row["description"] = "benchmark"
+        yield row
+
+
+def seed(path: Path, donations: int, projects: int, distribution: str,
+         seed_value: int):
+    """Заполнение БД открытыми очередями сопоставимых итогов."""
+    rng = random.Random(seed_value)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    project_mean = MEAN_AMOUNT * donations // max(projects, 1)
+    with engine.begin() as connection:
+        for model, count, mean in (
+            (Donation, donations, MEAN_AMOUNT),
+            (CharityProject, projects, project_mean),
+        ):
+            rows = seed_rows(model, amounts(rng, distribution, count, mean))
+            while True:
+                chunk = [row for _, row in zip(range(SEED_CHUNK), rows)]
+                if not chunk:
+                    break
+                connection.execute(insert(model.__table__), chunk)
+    engine.dispose()
+
+
+class PhaseTimer:
+    """Время этапов invest_it, измеряемое обёртками его шагов."""
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.mark = None
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] += now - self.mark
+        self.mark = now
+
+    @contextmanager
+    def patch(self, session: AsyncSession):
+        load_queues, allocate = utils.load_queues, utils.allocate
+        commit = session.commit
+
+        async def timed_load_queues(*args):
+            await load_queues(*args)
+            self.lap("load")
+
+        def timed_allocate(*args):
+            plan = allocate(*args)
+            self.lap("compute")
+            return plan
+
+        async def timed_commit():
+            self.lap("flush")
+            await commit()
+            self.lap("commit")
+
+        utils.load_queues, utils.allocate = timed_load_queues, timed_allocate
+        session.commit = timed_commit
+        try:
+            yield self
+        finally:
+            utils.load_queues, utils.allocate = load_queues, allocate
+            del session.commit
+
+
+async def invest(path: Path) -> dict:
+    """Один прогон invest_it с замером этапов."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    try:
+        async with session_factory() as session:
+            timer = PhaseTimer()
+            with timer.patch(session):
+                timer.mark = start = time.perf_counter()
+                plan = await utils.invest_it(session)
+                total = time.perf_counter() - start
+    finally:
+        await engine.dispose()
+    return {
+        "total": total,
+        **timer.phases,
+        "allocated": plan.total if plan is not None else None,
+        "transfers": len(plan.transfers) if plan is not None else None,
+    }
+
+
+def add_project(path: Path, full_amount: int):
+    """Поступление нового проекта в конец очереди."""
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "INSERT INTO charityproject (name, description, full_amount, "
+            "invested_amount, fully_invested, create_date) "
+            "VALUES ('incoming', 'benchmark', ?, 0, 0, ?)",
+            (full_amount, datetime.now().isoformat(sep=" ")),
+        )
+
+
+async def run_case(workdir: Path, donations: int, projects: int,
+                   distribution: str, seed_value: int, repeat: int) -> list:
+    """Замеры всех сценариев для одной комбинации размеров."""
+    template = workdir / f"template-{donations}-{projects}.db"
+    seed(template, donations, projects, distribution, seed_value)
+    allocated = workdir / f"allocated-{donations}-{projects}.db"
+    shutil.copy(template, allocated)
+    await invest(allocated)
+    add_project(allocated, MEAN_AMOUNT * 10)
+    results = []
+    for scenario, source in zip(SCENARIOS, (template, allocated)):
+        runs = []
+        for _ in range(repeat):
+            path = workdir / "run.db"
+            shutil.copy(source, path)
+            runs.append(await invest(path))
+            path.unlink()
+        results.append(
+            {
+                "scenario": scenario,
+                "donations": donations,
+                "projects": projects,
+                "distribution": distribution,
+                "invest_mode": settings.invest_mode,
+                "invest_strategy": settings.invest_strategy,
+                "seed": seed_value,
+                "runs": runs,
+                "median": {
+                    key: statistics.median(run[key] for run in runs)
+                    for key in ("total", *PHASES)
+                },
+            }
+        )
+    template.unlink()
+    allocated.unlink()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(donations=(10000,), projects=(1000,),
+                        distribution="pareto", seed_value=0, repeat=3,
+                        invest_mode=None, invest_strategy=None) -> dict:
+    """Замеры для всех комбинаций размеров очередей.
+
+    Режим и стратегия распределения меняются только на время замеров.
+    """
+    saved = settings.invest_mode, settings.invest_strategy
+    if invest_mode is not None:
+        settings.invest_mode = invest_mode
+    if invest_strategy is not None:
+        settings.invest_strategy = invest_strategy
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for donation_count in donations:
+                for project_count in projects:
+                    results.extend(
+                        await run_case(
+                            Path(workdir),
+                            donation_count,
+                            project_count,
+                            distribution,
+                            seed_value,
+                            repeat,
+                        )
+                    )
+    finally:
+        settings.invest_mode, settings.invest_strategy = saved
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": results,
+    }
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.allocation")
+    parser.add_argument(
+        "--donations", type=int, nargs="+", default=[10000],
+        help="размеры очереди открытых пожертвований",
+    )
+    parser.add_argument(
+        "--projects", type=int, nargs="+", default=[1000],
+        help="размеры очереди открытых проектов",
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=("pareto", "lognormal", "uniform"),
+        default="pareto",
+        help="распределение сумм",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--mode", choices=("batched", "window"), help="settings.invest_mode"
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=tuple(STRATEGIES),
+        help="settings.invest_strategy",
+    )
+    parser.add_argument("--output", type=Path, help="файл результатов")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    report = asyncio.run(
+        run_benchmark(
+            donations=args.donations,
+            projects=args.projects,
+            distribution=args.distribution,
+            seed_value=args.seed,
+            repeat=args.repeat,
+            invest_mode=args.mode,
+            invest_strategy=args.strategy,
+        )
+    )
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
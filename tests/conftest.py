@@ -43,6 +43,9 @@ except (NameError, ImportError):
     )
 
 
+from app.services.cache import read_cache
+from app.services.rebalance import rebalance_worker
+
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
 pytest_plugins = [
@@ -73,6 +76,9 @@ async def init_db():
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    # Записи кэша чтения и границы проходов относятся к удалённой БД
+    await read_cache.clear()
+    rebalance_worker.allocated_ids.clear()
 
 
 @pytest.fixture
@@ -0,0 +1,96 @@
+import pytest
+
+from app.services.allocation import allocate, simulate
+from app.services.strategies import STRATEGIES
+
+
+def test_allocate_closes_prefix_and_boundary():
+    plan = allocate([1, 2], [100, 50], [10, 11, 12], [30, 50, 40])
+    assert plan.total == 120
+    assert list(plan.projects.closed_ids) == [1]
+    assert (plan.projects.boundary_id, plan.projects.boundary_delta) == (
+        2, 20
+    )
+    assert list(plan.donations.closed_ids) == [10, 11, 12]
+    assert plan.donations.boundary_id is None
+    assert plan.transfers == [
+        (10, 1, 30), (11, 1, 50), (12, 1, 20), (12, 2, 20)
+    ], 'Переводы должны идти в порядке очередей проектов и пожертвований.'
+
+
+@pytest.mark.parametrize('project_rests, donation_rests', [
+    ([], [100]),
+    ([100], []),
+    ([], []),
+])
+def test_allocate_empty_queue(project_rests, donation_rests):
+    plan = allocate(
+        list(range(len(project_rests))), project_rests,
+        list(range(len(donation_rests))), donation_rests,
+    )
+    assert plan.total == 0
+    assert not plan.transfers
+    assert not plan.projects.closed_ids and not plan.donations.closed_ids
+    assert plan.projects.boundary_id is None
+    assert plan.donations.boundary_id is None
+
+
+def test_allocate_exact_match():
+    plan = allocate([1, 2], [40, 60], [5], [100])
+    assert list(plan.projects.closed_ids) == [1, 2]
+    assert list(plan.donations.closed_ids) == [5]
+    assert plan.projects.boundary_delta == plan.donations.boundary_delta == 0
+    assert plan.transfers == [(5, 1, 40), (5, 2, 60)]
+
+
+def test_allocate_large_backlog():
+    size = 100000
+    plan = allocate([1], [size // 2 + 3], list(range(size)), [1] * size)
+    assert len(plan.donations.closed_ids) == size // 2 + 3
+    assert plan.projects.closed_ids == [1]
+    assert len(plan.transfers) == size // 2 + 3
+
+
+def test_simulate_events_in_order():
+    steps = simulate(
+        [1], [50], [], [],
+        [('donation', 30), ('project', 100), ('donation', 200)],
+    )
+    assert [(step.id, step.invested_amount) for step in steps] == [
+        (-1, 30), (-2, 0), (-3, 120)
+    ]
+    assert steps[0].transfers == [(-1, 1, 30)]
+    assert list(steps[0].closed_donation_ids) == [-1]
+    assert not steps[1].transfers and not steps[1].closed_project_ids
+    assert steps[2].transfers == [(-3, 1, 20), (-3, -2, 100)]
+    assert list(steps[2].closed_project_ids) == [1, -2]
+    assert not steps[2].closed_donation_ids
+
+
+def test_simulate_open_donations():
+    steps = simulate([], [], [1, 2, 3], [40, 40, 40], [('project', 100)])
+    assert list(steps[0].closed_donation_ids) == [1, 2]
+    assert steps[0].transfers == [(1, -1, 40), (2, -1, 40), (3, -1, 20)]
+    assert list(steps[0].closed_project_ids) == [-1]
+
+
+def test_proportional_largest_remainder():
+    plan = allocate(
+        [1, 2, 3], [100, 1000, 300], [10], [1100],
+        STRATEGIES['proportional'],
+    )
+    assert not plan.projects.prefix
+    assert plan.projects.deltas == [(1, 78), (2, 786), (3, 236)], (
+        'Остаток округления должны получать проекты с наибольшей '
+        'дробной частью доли.'
+    )
+    assert plan.transfers == [(10, 1, 78), (10, 2, 786), (10, 3, 236)]
+
+
+def test_proportional_closes_all_when_covered():
+    plan = allocate(
+        [1, 2], [100, 300], [10, 11], [250, 250],
+        STRATEGIES['proportional'],
+    )
+    assert plan.projects.prefix and list(plan.projects.closed_ids) == [1, 2]
+    assert plan.donations.boundary_delta == 150
@@ -0,0 +1,29 @@
+from app.core.config import settings
+from benchmarks.allocation import PHASES, SCENARIOS, run_benchmark
+
+
+async def test_benchmark_report():
+    saved = settings.invest_mode, settings.invest_strategy
+    report = await run_benchmark(
+        donations=(50,), projects=(5,), repeat=1,
+        invest_mode='window', invest_strategy='closest',
+    )
+    assert (settings.invest_mode, settings.invest_strategy) == saved, (
+        'Замеры не должны менять настройки распределения процесса.'
+    )
+    results = report['results']
+    assert [
+        (result['invest_mode'], result['invest_strategy'])
+        for result in results
+    ] == [('window', 'closest')] * len(SCENARIOS)
+    assert [result['scenario'] for result in results] == list(SCENARIOS), (
+        'Замеры должны выполняться для всех сценариев.'
+    )
+    for result in results:
+        run, = result['runs']
+        assert run['allocated'] > 0, (
+            'Прогон должен распределять пожертвования по проектам.'
+        )
+        assert sum(run[phase] for phase in PHASES) <= run['total'], (
+            'Сумма времени этапов не может превышать общее время.'
+        )
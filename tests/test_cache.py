@@ -0,0 +1,99 @@
+import asyncio
+
+from conftest import TestingSessionLocal, engine
+from sqlalchemy import event
+
+from app.api.utils import invest_it
+from app.core.config import settings
+from app.services.cache import MemoryBackend, ReadCache, make_backend
+
+
+def count_selects(table):
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        if statement.startswith('SELECT') and f'FROM {table}' in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    return statements, lambda: event.remove(
+        engine.sync_engine, 'before_cursor_execute', collect
+    )
+
+
+def test_list_served_from_cache(superuser_client, charity_project):
+    statements, stop = count_selects('charityproject')
+    try:
+        first = superuser_client.get('/charity_project/').json()
+        second = superuser_client.get('/charity_project/').json()
+    finally:
+        stop()
+    assert first == second
+    assert len(statements) == 1, (
+        'Повторный запрос списка должен обслуживаться из кэша.'
+    )
+
+
+def test_write_invalidates_cache(superuser_client, charity_project):
+    superuser_client.get('/charity_project/')
+    superuser_client.patch('/charity_project/1', json={'full_amount': 5000})
+    projects = superuser_client.get('/charity_project/').json()
+    assert projects[0]['full_amount'] == 5000, (
+        'Изменение проекта должно сбрасывать кэш списка.'
+    )
+    superuser_client.post('/charity_project/', json={
+        'name': 'katana',
+        'description': 'Katana is sharper',
+        'full_amount': 1000,
+    })
+    assert len(superuser_client.get('/charity_project/').json()) == 2
+
+
+async def test_invest_invalidates_cache(superuser_client, charity_project,
+                                        donation):
+    superuser_client.get('/donation/')
+    async with TestingSessionLocal() as session:
+        await invest_it(session)
+    donations = superuser_client.get('/donation/').json()
+    assert donations[0]['invested_amount'] == donation.full_amount, (
+        'Проход распределения должен сбрасывать кэш списков.'
+    )
+
+
+async def test_single_flight():
+    cache = ReadCache(MemoryBackend(maxsize=10, ttl=60))
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['row']
+
+    results = await asyncio.gather(
+        *(cache.get_or_load('charityproject', 'key', load) for _ in range(10))
+    )
+    assert results == [['row']] * 10
+    assert len(calls) == 1, (
+        'Одновременные промахи по ключу должны выполнять одну загрузку.'
+    )
+    await cache.invalidate('charityproject')
+    await cache.get_or_load('charityproject', 'key', load)
+    assert len(calls) == 2, 'Сброс должен приводить к новой загрузке.'
+
+
+async def test_bounded_size():
+    cache = ReadCache(MemoryBackend(maxsize=2, ttl=60))
+
+    async def load():
+        return ['row']
+
+    for key in ('a', 'b', 'c'):
+        await cache.get_or_load('donation', key, load)
+    assert len(cache.backend.data) == 2, (
+        'Размер кэша должен ограничиваться maxsize.'
+    )
+
+
+def test_cache_disabled(monkeypatch):
+    monkeypatch.setattr(settings, 'cache_ttl', 0)
+    assert make_backend() is None
@@ -438,14 +438,15 @@ def test_update_charity_project_full_amount_equal_invested_amount(
         {'create_date': '2010-10-10'},
         {'close_date': '2010-10-10'},
         {'fully_invested': True},
+        {'priority': None},
     ],
 )
 def test_update_charity_project_invalid(superuser_client, charity_project,
                                         json):
     response = superuser_client.patch('/charity_project/1', json=json)
     assert response.status_code == 422, (
-        'При редактировании проекта нельзя назначать пустое имя, описание или '
-        'цель фонда. Должен возвращаться статус-код 422.'
+        'При редактировании проекта нельзя назначать пустое имя, описание, '
+        'цель фонда или приоритет. Должен возвращаться статус-код 422.'
     )
 
 
@@ -696,3 +697,52 @@ def test_get_all_charity_project_not_auth_user(test_client, charity_project,
             'name': 'nunchaku'
         }
     ]
+
+
+def test_create_charity_projects_bulk(superuser_client, donation):
+    response = superuser_client.post('/charity_project/bulk', json=[
+        {'name': 'Мертвый Бассейн', 'description': 'Deadpool', 'full_amount': 60},
+        {'name': 'nunchaku', 'description': 'Nunchaku', 'full_amount': 60},
+    ])
+    assert response.status_code == 200, (
+        'При пакетном создании проектов должен возвращаться статус-код 200.'
+    )
+    data = response.json()
+    assert [project['name'] for project in data] == [
+        'Мертвый Бассейн', 'nunchaku'
+    ]
+    assert [
+        (project['invested_amount'], project['fully_invested'])
+        for project in data
+    ] == [(60, True), (40, False)], (
+        'Пакетно созданные проекты должны получать пожертвования '
+        'в порядке следования.'
+    )
+
+
+def test_create_charity_projects_bulk_same_date(superuser_client,
+                                                charity_project):
+    # Время заморожено: пакет создаётся с той же датой, что и проект
+    response = superuser_client.post('/charity_project/bulk', json=[
+        {'name': 'nunchaku', 'description': 'Nunchaku', 'full_amount': 60},
+    ])
+    assert [project['name'] for project in response.json()] == [
+        'nunchaku'
+    ], 'Ответ должен содержать только проекты пакета.'
+
+
+@pytest.mark.parametrize('names', [
+    ['nunchaku', 'nunchaku'],
+    ['Мертвый Бассейн', 'chimichangas4life'],
+])
+def test_create_charity_projects_bulk_same_name(superuser_client,
+                                                charity_project, names):
+    response = superuser_client.post('/charity_project/bulk', json=[
+        {'name': name, 'description': 'Project', 'full_amount': 100}
+        for name in names
+    ])
+    assert response.status_code == 400, (
+        'Имена проектов пакета должны быть уникальными.'
+    )
+    response = superuser_client.get('/charity_project/')
+    assert len(response.json()) == 1
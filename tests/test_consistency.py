@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from conftest import TestingSessionLocal
+
+from app.services.consistency import check_consistency
+
+
+def blend_queues(mixer):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life',
+        description='Huge fan of chimichangas. Wanna buy a lot',
+        full_amount=100,
+        invested_amount=40,
+        create_date=datetime(2010, 10, 10),
+    )
+    for day, amount in ((1, 30), (2, 50)):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=amount,
+            create_date=datetime(2011, 11, day),
+        )
+
+
+async def test_check_consistency_fix(mixer, tmp_path):
+    blend_queues(mixer)
+    output = []
+    report = await check_consistency(
+        TestingSessionLocal, fix=True, chunk_size=1,
+        checkpoint_path=tmp_path / 'check.json', output=output.append,
+    )
+    assert (report.checked, report.mismatches, report.fixed) == (3, 3, 3), (
+        'Проверка должна найти и исправить расхождения с распределением FIFO.'
+    )
+    assert output[0].startswith('charityproject 1: invested_amount 40 -> 80')
+    assert not (tmp_path / 'check.json').exists()
+    output = []
+    report = await check_consistency(
+        TestingSessionLocal, output=output.append
+    )
+    assert report.mismatches == 0
+    assert output == [], 'После исправления расхождений быть не должно.'
+
+
+async def test_check_consistency_resume(mixer, tmp_path):
+    blend_queues(mixer)
+    checkpoint = tmp_path / 'check.json'
+    checkpoint.write_text(
+        '{"pools": {"": {"total": 80, "charityproject": {"done": true, '
+        '"position": 100, "create_date": "2010-10-10T00:00:00", "id": 1}}}}'
+    )
+    output = []
+    report = await check_consistency(
+        TestingSessionLocal, fix=True, checkpoint_path=checkpoint,
+        output=output.append,
+    )
+    assert (report.checked, report.fixed) == (2, 2), (
+        'Проверка должна продолжаться с сохранённой позиции.'
+    )
+    assert [line.split(':')[0] for line in output] == [
+        'donation 1', 'donation 2'
+    ], 'Проекты до сохранённой позиции не должны проверяться повторно.'
+
@@ -197,3 +197,44 @@ def test_create_donation_check_create_date(user_client):
         'При создании двух пожертвований с паузой (в 1 секунду, например) у '
         'них должны быть разные `create_date`'
     )
+
+
+def test_create_donations_bulk(user_client, charity_project):
+    response = user_client.post('/donation/bulk', json=[
+        {'full_amount': 600000},
+        {'full_amount': 500000, 'comment': 'To you for chimichangas'},
+    ])
+    assert response.status_code == 200, (
+        'При пакетном создании пожертвований должен возвращаться '
+        'статус-код 200.'
+    )
+    assert response.json() == [
+        {'id': 1, 'invested_amount': 600000, 'fully_invested': True},
+        {'id': 2, 'invested_amount': 400000, 'fully_invested': False},
+    ], (
+        'Пакетно созданные пожертвования должны распределяться одним '
+        'проходом в порядке следования.'
+    )
+    response = user_client.get('/donation/my')
+    assert len(response.json()) == 2
+
+
+def test_create_donations_bulk_same_date(user_client, donation):
+    # Время заморожено: пакет создаётся с той же датой, что и donation
+    response = user_client.post('/donation/bulk', json=[
+        {'full_amount': 10},
+        {'full_amount': 20},
+    ])
+    assert [item['id'] for item in response.json()] == [2, 3], (
+        'Ответ должен содержать только пожертвования пакета.'
+    )
+
+
+@pytest.mark.parametrize('json', [
+    [],
+    [{'full_amount': 10}, {'full_amount': -1}],
+    {'full_amount': 10},
+])
+def test_create_donations_bulk_invalid(user_client, json):
+    response = user_client.post('/donation/bulk', json=json)
+    assert response.status_code == 422
@@ -0,0 +1,82 @@
+from conftest import TestingSessionLocal, engine
+from sqlalchemy import event, text
+
+from app.api.utils import invest_it
+from app.api.streaming import NDJSON
+
+
+def get_projects(client, etag=None, **params):
+    headers = {} if etag is None else {'If-None-Match': etag}
+    return client.get('/charity_project/', params=params, headers=headers)
+
+
+def test_not_modified(superuser_client, charity_project):
+    response = get_projects(superuser_client)
+    etag = response.headers['ETag']
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    try:
+        response = get_projects(superuser_client, etag)
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+    assert response.status_code == 304, (
+        'При совпадении If-None-Match должен возвращаться статус-код 304.'
+    )
+    assert response.headers['ETag'] == etag
+    assert not [
+        statement for statement in statements
+        if 'charityproject' in statement
+    ], 'Ответ 304 не должен обращаться к таблице проектов.'
+
+
+async def test_etag_changes_on_writes(superuser_client, charity_project,
+                                      donation):
+    etags = [get_projects(superuser_client).headers['ETag']]
+    superuser_client.patch('/charity_project/1', json={'full_amount': 5000})
+    etags.append(get_projects(superuser_client).headers['ETag'])
+    async with TestingSessionLocal() as session:
+        await invest_it(session)
+    etags.append(get_projects(superuser_client).headers['ETag'])
+    assert len(set(etags)) == 3, (
+        'ETag должен меняться при изменении проекта и после прохода '
+        'распределения.'
+    )
+    assert get_projects(superuser_client, etags[0]).status_code == 200
+
+
+def test_etag_depends_on_request(superuser_client, charity_project):
+    etags = {
+        get_projects(superuser_client).headers['ETag'],
+        get_projects(superuser_client, fields='id').headers['ETag'],
+        superuser_client.get(
+            '/charity_project/', headers={'Accept': NDJSON}
+        ).headers['ETag'],
+    }
+    assert len(etags) == 3, (
+        'Разные представления списка должны иметь разные ETag.'
+    )
+
+
+async def test_external_write_refreshes_cache(superuser_client,
+                                              charity_project):
+    etag = get_projects(superuser_client).headers['ETag']
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            text('UPDATE charityproject SET full_amount = 500')
+        )
+        await session.commit()
+    response = get_projects(superuser_client)
+    assert response.json()[0]['full_amount'] == 500, (
+        'Изменение в обход приложения должно сразу попадать в список.'
+    )
+    assert response.headers['ETag'] != etag
+    assert get_projects(superuser_client, etag).status_code == 200, (
+        'Устаревший ETag не должен получать 304.'
+    )
+    assert get_projects(
+        superuser_client, response.headers['ETag']
+    ).status_code == 304
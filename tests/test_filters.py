@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def projects(mixer):
+    # (full_amount, invested_amount, closed, create_date)
+    for number, (full_amount, invested_amount, closed) in enumerate((
+        (100, 100, True),
+        (500, 50, False),
+        (1000, 0, False),
+        (300, 120, True),
+    )):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project-{number}',
+            description='Filter',
+            full_amount=full_amount,
+            invested_amount=invested_amount,
+            fully_invested=full_amount == invested_amount,
+            create_date=datetime(2011, 11, 1 + number),
+            close_date=datetime(2011, 12, 1) if closed else None,
+        )
+
+
+@pytest.mark.parametrize('params, expected', [
+    ({}, [1, 2, 3, 4]),
+    ({'closed': False}, [2, 3]),
+    ({'closed': True}, [1, 4]),
+    ({'fully_invested': True}, [1]),
+    ({'fully_invested': False, 'closed': True}, [4]),
+    ({'created_from': '2011-11-02T00:00:00'}, [2, 3, 4]),
+    ({'created_to': '2011-11-02T00:00:00'}, [1, 2]),
+    ({'min_amount': 300}, [2, 3, 4]),
+    ({'min_amount': 300, 'max_amount': 500}, [2, 4]),
+])
+def test_project_filters(superuser_client, projects, params, expected):
+    response = superuser_client.get(
+        '/charity_project/', params={**params, 'fields': 'id'}
+    )
+    assert response.status_code == 200
+    assert [project['id'] for project in response.json()] == expected, (
+        f'Фильтры {params} должны отбирать проекты {expected}.'
+    )
+
+
+def test_filters_with_pages(superuser_client, projects):
+    response = superuser_client.get(
+        '/charity_project/', params={'closed': False, 'limit': 1}
+    )
+    assert [project['id'] for project in response.json()] == [2]
+    response = superuser_client.get('/charity_project/', params={
+        'closed': False,
+        'limit': 1,
+        'cursor': response.headers['X-Next-Cursor'],
+    })
+    assert [project['id'] for project in response.json()] == [3], (
+        'Фильтры должны применяться к каждой странице списка.'
+    )
+
+
+def test_invalid_filter(superuser_client):
+    response = superuser_client.get(
+        '/charity_project/', params={'min_amount': -1}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,180 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from conftest import TEST_DB, TestingSessionLocal, engine
+from sqlalchemy import event
+
+from app.api.pagination import encode_cursor
+from app.core.config import settings
+from app.crud.charity_projects import crud_charity_projects
+
+# Таблицы, полный просмотр которых недопустим на горячих путях
+TABLES = ('charityproject', 'donation')
+
+
+@pytest.fixture(params=['batched', 'window'])
+def invest_mode(request, monkeypatch):
+    monkeypatch.setattr(settings, 'invest_mode', request.param)
+    return request.param
+
+
+@pytest.fixture
+def statements():
+    collected = []
+
+    def collect(conn, cursor, statement, parameters, *args):
+        if not statement.startswith('INSERT'):
+            collected.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    yield collected
+    event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+
+
+def query_plans(statements):
+    """Шаги планов выполненных запросов."""
+    details = []
+    with sqlite3.connect(TEST_DB) as connection:
+        for statement, parameters in statements:
+            plan = connection.execute(
+                f'EXPLAIN QUERY PLAN {statement}', parameters
+            ).fetchall()
+            details.extend(detail for *_, detail in plan)
+    return details
+
+
+def uses_covering_index(details, table, index):
+    """Таблица читается по покрывающему индексу (просмотр или поиск)."""
+    return any(
+        f'USING COVERING INDEX {index} ' in f'{detail} '
+        for detail in details
+        if detail.split()[1:2] == [table]
+    )
+
+
+def full_scans(details):
+    """Шаги с полным просмотром таблиц очередей."""
+    return [
+        detail for detail in details
+        if detail.split()[:2] in (['SCAN', table] for table in TABLES)
+        if 'INDEX' not in detail
+    ]
+
+
+def test_allocation_uses_indexes(user_client, charity_project, donation,
+                                 statements, invest_mode):
+    user_client.post('/donation/', json={'full_amount': 500})
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        'Запросы распределения не должны просматривать таблицы целиком: '
+        f'{full_scans(details)}'
+    )
+    for table in TABLES:
+        assert uses_covering_index(details, table, f'ix_{table}_open_queue'), (
+            'Очередь открытых объектов должна читаться по покрывающему '
+            'частичному индексу.'
+        )
+
+
+@pytest.mark.parametrize('strategy, index', [
+    ('closest', 'ix_charityproject_closest_queue'),
+    ('priority', 'ix_charityproject_priority_queue'),
+    ('proportional', 'ix_charityproject_open_queue'),
+])
+def test_strategy_queue_uses_index(user_client, charity_project, donation,
+                                   statements, invest_mode, monkeypatch,
+                                   strategy, index):
+    monkeypatch.setattr(settings, 'invest_strategy', strategy)
+    user_client.post('/donation/', json={'full_amount': 500})
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        f'Запросы стратегии {strategy} не должны просматривать таблицы '
+        f'целиком: {full_scans(details)}'
+    )
+    assert uses_covering_index(details, 'charityproject', index), (
+        f'Очередь стратегии {strategy} должна читаться по индексу {index}.'
+    )
+
+
+def test_my_donations_use_index(user_client, donation, statements):
+    user_client.get('/donation/my')
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        'Список пожертвований пользователя не должен просматривать '
+        f'таблицу целиком: {full_scans(details)}'
+    )
+    assert any('ix_donation_user' in detail for detail in details), (
+        'Пожертвования пользователя должны выбираться по индексу user_id.'
+    )
+
+
+async def test_closed_projects_report_uses_index(statements):
+    async with TestingSessionLocal() as session:
+        await crud_charity_projects.get_projects_by_completion_rate(session)
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        'Отчёт по закрытым проектам не должен просматривать таблицу '
+        f'целиком: {full_scans(details)}'
+    )
+    assert any('ix_charityproject_closed' in detail for detail in details), (
+        'Закрытые проекты должны выбираться по частичному индексу.'
+    )
+
+
+@pytest.mark.parametrize('url, table', [
+    ('/charity_project/', 'charityproject'),
+    ('/donation/', 'donation'),
+])
+def test_pool_listing_uses_index(superuser_client, charity_project, donation,
+                                 statements, url, table):
+    superuser_client.get(url, params={'pool': 'kids'})
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        'Список объектов пула не должен просматривать таблицу целиком: '
+        f'{full_scans(details)}'
+    )
+    assert any(f'ix_{table}_pool' in detail for detail in details), (
+        'Объекты пула должны выбираться по индексу pool.'
+    )
+
+
+@pytest.mark.parametrize('table', TABLES)
+def test_page_uses_index(superuser_client, charity_project, donation,
+                         statements, table):
+    url = '/charity_project/' if table == 'charityproject' else '/donation/'
+    superuser_client.get(url, params={'limit': 1})
+    superuser_client.get(url, params={
+        'limit': 1, 'cursor': encode_cursor(datetime(2000, 1, 1), 1),
+    })
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        'Страница списка не должна просматривать таблицу целиком: '
+        f'{full_scans(details)}'
+    )
+    assert any(f'ix_{table}_created' in detail for detail in details), (
+        'Страница списка должна выбираться по индексу (create_date, id).'
+    )
+
+
+@pytest.mark.parametrize('params, index', [
+    ({'closed': False}, 'open_created'),
+    ({'closed': True}, 'closed_created'),
+    ({'fully_invested': True}, 'invested_created'),
+    ({'created_from': '2010-01-01T00:00:00'}, 'created'),
+    ({'min_amount': 100, 'max_amount': 1000}, 'amount'),
+])
+@pytest.mark.parametrize('table', TABLES)
+def test_filters_use_indexes(superuser_client, charity_project, donation,
+                             statements, table, params, index):
+    url = '/charity_project/' if table == 'charityproject' else '/donation/'
+    superuser_client.get(url, params=params)
+    details = query_plans(statements)
+    assert not full_scans(details), (
+        f'Фильтр {params} не должен просматривать таблицу целиком: '
+        f'{full_scans(details)}'
+    )
+    assert any(f'ix_{table}_{index} ' in f'{detail} ' for detail in details), (
+        f'Фильтр {params} должен обслуживаться индексом ix_{table}_{index}: '
+        f'{details}'
+    )
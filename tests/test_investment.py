@@ -1,3 +1,23 @@
+import time
+from datetime import datetime
+
+import pytest
+from conftest import TestingSessionLocal, engine
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event, select, update
+
+import app.api.utils as utils
+from app.core.config import Settings, settings
+from app.models import CharityProject, Donation, QueueTotal
+from app.services.rebalance import RebalanceWorker, rebalance_worker
+
+
+@pytest.fixture(params=['batched', 'window'])
+def invest_mode(request, monkeypatch):
+    monkeypatch.setattr(settings, 'invest_mode', request.param)
+    return request.param
+
+
 def test_donation_exist_non_project(superuser_client, donation):
     response_donation = superuser_client.get('/donation/')
     data_donation = response_donation.json()
@@ -53,3 +73,500 @@ def test_donation_to_little_invest_project(user_client, charity_project_little_i
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+def test_project_absorbs_donations_in_order(superuser_client, mixer,
+                                            invest_mode):
+    for day, amount in ((1, 30), (2, 50), (3, 40)):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=amount,
+            create_date=datetime(2011, 11, day),
+        )
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 100,
+    })
+    assert response.json()['fully_invested'], (
+        'Проект должен быть закрыт ожидающими пожертвованиями.'
+    )
+    data = superuser_client.get('/donation/').json()
+    assert [
+        (item['invested_amount'], item['fully_invested']) for item in data
+    ] == [(30, True), (50, True), (20, False)], (
+        'Пожертвования должны распределяться в порядке поступления.'
+    )
+
+
+def test_investments_ledger(superuser_client, donation, another_donation,
+                            invest_mode):
+    superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 1000,
+    })
+    response = superuser_client.get('/charity_project/1/investments')
+    assert response.status_code == 200
+    assert [
+        (item['donation_id'], item['amount']) for item in response.json()
+    ] == [(1, 100), (2, 900)], (
+        'Каждый перевод из пожертвования в проект должен записываться '
+        'в журнал инвестиций.'
+    )
+    response = superuser_client.get('/charity_project/2/investments')
+    assert response.status_code == 404
+
+
+def test_donation_investments_owner(user_client, charity_project, donation,
+                                    another_donation):
+    user_client.post('/donation/', json={'full_amount': 50})
+    response = user_client.get('/donation/3/investments')
+    assert response.status_code == 200
+    assert [
+        (item['project_id'], item['amount']) for item in response.json()
+    ] == [(1, 50)]
+    response = user_client.get('/donation/2/investments')
+    assert response.status_code == 404, (
+        'Распределение чужого пожертвования недоступно пользователю.'
+    )
+
+
+def test_bulk_update_statements(superuser_client, mixer, invest_mode):
+    for day in range(1, 29):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=10,
+            create_date=datetime(2011, 11, day),
+        )
+    statements = []
+
+    def count_updates(conn, cursor, statement, *args):
+        if statement.startswith('UPDATE'):
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_updates)
+    try:
+        response = superuser_client.post('/charity_project/', json={
+            'name': 'chimichangas4life',
+            'description': 'Huge fan of chimichangas. Wanna buy a lot',
+            'full_amount': 275,
+        })
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', count_updates
+        )
+    assert response.json()['invested_amount'] == 275
+    assert len(statements) == 3, (
+        'Результаты распределения должны записываться групповыми UPDATE, '
+        'а не отдельным запросом на каждое пожертвование.'
+    )
+    data = superuser_client.get('/donation/').json()
+    assert sum(item['fully_invested'] for item in data) == 27
+    assert data[27]['invested_amount'] == 5
+
+
+async def test_load_stops_at_cutoff(mixer):
+    for number in range(1000):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=10,
+            create_date=datetime(2011, 11, 11, 0, 0, number % 60),
+        )
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life',
+        description='Huge fan of chimichangas. Wanna buy a lot',
+        full_amount=2400,
+        create_date=datetime(2012, 12, 12),
+    )
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        if statement.startswith('SELECT') and 'FROM donation' in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    try:
+        async with TestingSessionLocal() as session:
+            projects, donations = utils.open_queues(session)
+            await utils.load_queues(projects, donations)
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+    assert len(statements) == 1, (
+        'Очередь пожертвований должна читаться одним потоковым запросом.'
+    )
+    assert 240 <= len(donations.rows) < 1000, (
+        'Чтение очереди должно прекращаться по достижении границы '
+        'распределения.'
+    )
+    assert donations.stream is None, (
+        'Курсор очереди должен закрываться после загрузки.'
+    )
+
+
+async def test_invest_retries_on_conflict(mixer, monkeypatch):
+    for day in (1, 2):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=10,
+            create_date=datetime(2011, 11, day),
+        )
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life',
+        description='Huge fan of chimichangas. Wanna buy a lot',
+        full_amount=15,
+        create_date=datetime(2012, 12, 12),
+    )
+    load_queues = utils.load_queues
+    calls = []
+
+    async def concurrent_load_queues(projects, donations):
+        await load_queues(projects, donations)
+        calls.append(projects)
+        if len(calls) == 1:
+            # Параллельная транзакция успела изменить первое пожертвование
+            async with TestingSessionLocal() as other:
+                await other.execute(
+                    update(Donation)
+                    .where(Donation.id == 1)
+                    .values(invested_amount=5, version=Donation.version + 1)
+                )
+                await other.commit()
+
+    monkeypatch.setattr(utils, 'load_queues', concurrent_load_queues)
+    async with TestingSessionLocal() as session:
+        plan = await utils.invest_it(session)
+        donations = (await session.execute(
+            select(Donation).order_by(Donation.id)
+        )).scalars().all()
+    assert len(calls) == 2, (
+        'При конфликте с параллельной транзакцией распределение '
+        'должно повторяться.'
+    )
+    assert plan.transfers == [(1, 1, 5), (2, 1, 10)]
+    assert [donation.invested_amount for donation in donations] == [10, 10]
+
+
+def test_background_investment(user_client, mixer, monkeypatch):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas4life',
+        description='Huge fan of chimichangas. Wanna buy a lot',
+        full_amount=1000,
+        create_date=datetime(2010, 10, 10),
+    )
+    monkeypatch.setattr(settings, 'invest_in_background', True)
+    monkeypatch.setattr(
+        rebalance_worker, 'session_factory', TestingSessionLocal
+    )
+    response = user_client.post('/donation/', json={'full_amount': 100})
+    assert response.status_code == 200
+    for _ in range(100):
+        status = user_client.get('/donation/1/status').json()
+        if status['allocated']:
+            break
+        time.sleep(0.02)
+    assert status == {
+        'id': 1,
+        'invested_amount': 100,
+        'fully_invested': True,
+        'allocated': True,
+    }, 'Фоновое распределение должно обработать новое пожертвование.'
+
+
+def test_simulate_allocation(superuser_client, donation, another_donation):
+    response = superuser_client.post('/allocation/simulate', json=[
+        {'type': 'project', 'full_amount': 1000},
+        {'type': 'donation', 'full_amount': 50},
+    ])
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]['closed_donation_ids'] == [1]
+    assert data[0]['transfers'] == [
+        {'donation_id': 1, 'project_id': -1, 'amount': 100},
+        {'donation_id': 2, 'project_id': -1, 'amount': 900},
+    ]
+    assert data[1]['invested_amount'] == 0
+    response = superuser_client.get('/donation/')
+    assert [item['invested_amount'] for item in response.json()] == [0, 0], (
+        'Моделирование распределения не должно изменять данные.'
+    )
+
+
+async def test_queue_totals_follow_changes(superuser_client, mixer,
+                                           invest_mode):
+    for day in (1, 2, 3):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=100,
+            create_date=datetime(2011, 11, day),
+        )
+    superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 150,
+    })
+    superuser_client.post('/charity_project/', json={
+        'name': 'nunchaku',
+        'description': 'Nunchaku is better',
+        'full_amount': 500,
+    })
+    superuser_client.post('/charity_project/', json={
+        'name': 'katana',
+        'description': 'Katana is sharper',
+        'full_amount': 1000,
+    })
+    superuser_client.delete('/charity_project/3')
+    async with TestingSessionLocal() as session:
+        totals = dict((await session.execute(
+            select(QueueTotal.queue, QueueTotal.amount)
+        )).all())
+        expected = {}
+        for model in (CharityProject, Donation):
+            rows = (await session.execute(
+                select(model).where(model.close_date.is_(None))
+            )).scalars().all()
+            expected[model.__tablename__] = sum(
+                row.full_amount - row.invested_amount for row in rows
+            )
+    assert totals == expected == {'charityproject': 350, 'donation': 0}, (
+        'Итоги очередей должны совпадать с суммой остатков открытых '
+        'объектов после создания, распределения и удаления.'
+    )
+
+
+def test_empty_queue_skips_scan(superuser_client, charity_project,
+                                invest_mode):
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    try:
+        superuser_client.post('/charity_project/', json={
+            'name': 'nunchaku',
+            'description': 'Nunchaku is better',
+            'full_amount': 500,
+        })
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+    scans = [
+        statement for statement in statements
+        if statement.startswith('SELECT') and 'FROM donation' in statement
+    ]
+    assert not scans, (
+        'При пустой очереди пожертвований распределение не должно '
+        'читать очереди.'
+    )
+
+
+@pytest.mark.parametrize('strategy, invested, transfers', [
+    ('fifo', [100, 1000, 0], [(1, 1, 100), (1, 2, 1000)]),
+    ('closest', [100, 700, 300], [(1, 1, 100), (1, 3, 300), (1, 2, 700)]),
+    ('priority', [0, 1000, 100], [(1, 2, 1000), (1, 3, 100)]),
+    ('proportional', [78, 786, 236], [(1, 1, 78), (1, 2, 786), (1, 3, 236)]),
+])
+async def test_invest_strategies(mixer, monkeypatch, invest_mode, strategy,
+                                 invested, transfers):
+    monkeypatch.setattr(settings, 'invest_strategy', strategy)
+    for number, (full_amount, priority) in enumerate(
+        ((100, 0), (1000, 5), (300, 1)), 1
+    ):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {number}',
+            description='Huge fan of chimichangas. Wanna buy a lot',
+            full_amount=full_amount,
+            priority=priority,
+            create_date=datetime(2010, 10, number),
+        )
+    mixer.blend(
+        'app.models.donation.Donation',
+        user_id=1,
+        full_amount=1100,
+        create_date=datetime(2011, 11, 11),
+    )
+    async with TestingSessionLocal() as session:
+        plan = await utils.invest_it(session)
+        projects = (await session.execute(
+            select(CharityProject).order_by(CharityProject.id)
+        )).scalars().all()
+        totals = dict((await session.execute(
+            select(QueueTotal.queue, QueueTotal.amount)
+        )).all())
+    assert [project.invested_amount for project in projects] == invested, (
+        f'Распределение по стратегии {strategy} выполнено неверно.'
+    )
+    assert [project.fully_invested for project in projects] == [
+        amount == project.full_amount
+        for amount, project in zip(invested, projects)
+    ]
+    assert sorted(plan.transfers) == sorted(transfers), (
+        'Журнал переводов должен соответствовать зачисленным суммам.'
+    )
+    assert totals == {
+        'charityproject': 1400 - 1100, 'donation': 0
+    }, 'Итоги очередей должны учитывать распределение любой стратегии.'
+
+
+def test_project_priority(superuser_client, monkeypatch):
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 1000,
+        'priority': 3,
+    })
+    assert response.status_code == 200
+    assert 'priority' not in response.json(), (
+        'Приоритет проекта не должен менять формат ответа.'
+    )
+    response = superuser_client.patch(
+        '/charity_project/1', json={'priority': 7}
+    )
+    assert response.status_code == 200
+    engine_url = str(engine.url).replace('+aiosqlite', '')
+    with create_engine(engine_url).connect() as connection:
+        priority = connection.execute(
+            select(CharityProject.priority)
+        ).scalar()
+    assert priority == 7, (
+        'Суперюзер должен иметь возможность менять приоритет.'
+    )
+
+
+def test_simulate_requires_fifo(superuser_client, monkeypatch):
+    monkeypatch.setattr(settings, 'invest_strategy', 'closest')
+    response = superuser_client.post(
+        '/allocation/simulate', json=[{'type': 'project', 'full_amount': 1}]
+    )
+    assert response.status_code == 400, (
+        'Моделирование поддерживается только для стратегии fifo.'
+    )
+
+
+async def test_pools_invest_independently(superuser_client, mixer,
+                                          invest_mode):
+    for pool in (None, 'kids'):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=100,
+            pool=pool,
+            create_date=datetime(2011, 11, 11),
+        )
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 150,
+        'pool': 'kids',
+    })
+    assert response.json()['invested_amount'] == 100, (
+        'Проект пула должен получать только пожертвования своего пула.'
+    )
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'nunchaku',
+        'description': 'Nunchaku is better',
+        'full_amount': 50,
+    })
+    assert response.json()['invested_amount'] == 50
+    projects = superuser_client.get(
+        '/charity_project/', params={'pool': 'kids'}
+    ).json()
+    assert [project['name'] for project in projects] == [
+        'chimichangas4life'
+    ], 'Список проектов должен фильтроваться по пулу.'
+    async with TestingSessionLocal() as session:
+        totals = (await session.execute(
+            select(QueueTotal.queue, QueueTotal.pool, QueueTotal.amount)
+        )).all()
+    assert sorted(totals) == [
+        ('charityproject', '', 0),
+        ('charityproject', 'kids', 50),
+        ('donation', '', 50),
+        ('donation', 'kids', 0),
+    ], 'Итоги очередей должны вестись по каждому пулу.'
+
+
+def test_background_pools_run_concurrently(user_client, mixer, monkeypatch):
+    for pool in ('kids', 'pets'):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project-{pool}',
+            description='Pool project',
+            full_amount=1000,
+            pool=pool,
+            create_date=datetime(2010, 10, 10),
+        )
+    monkeypatch.setattr(settings, 'invest_in_background', True)
+    monkeypatch.setattr(
+        rebalance_worker, 'session_factory', TestingSessionLocal
+    )
+    pools = []
+    invest_it = utils.invest_it
+
+    async def record_invest_it(session, pool=None):
+        pools.append(pool)
+        return await invest_it(session, pool)
+
+    monkeypatch.setattr('app.services.rebalance.invest_it', record_invest_it)
+    for pool in ('kids', 'pets'):
+        response = user_client.post(
+            '/donation/', json={'full_amount': 100, 'pool': pool}
+        )
+        assert response.status_code == 200
+    for _ in range(100):
+        statuses = [
+            user_client.get(f'/donation/{donation_id}/status').json()
+            for donation_id in (1, 2)
+        ]
+        if all(status['allocated'] for status in statuses):
+            break
+        time.sleep(0.02)
+    assert [status['invested_amount'] for status in statuses] == [100, 100]
+    assert sorted(pools) == ['kids', 'pets'], (
+        'Фоновый обработчик должен выполнить по одному проходу на пул.'
+    )
+
+
+async def test_allocated_tracks_processed_ids(mixer):
+    mixer.blend(
+        'app.models.donation.Donation',
+        user_id=2,
+        full_amount=100,
+        create_date=datetime(2011, 11, 11),
+    )
+    worker = RebalanceWorker(TestingSessionLocal)
+    await worker._invest(None)
+    # Вставлено после чтения очереди, но с более ранней датой создания
+    mixer.blend(
+        'app.models.donation.Donation',
+        user_id=2,
+        full_amount=100,
+        create_date=datetime(2010, 10, 10),
+    )
+    assert worker.is_allocated(None, 1)
+    assert not worker.is_allocated(None, 2), (
+        'Пожертвование, вставленное после прохода, не должно считаться '
+        'распределённым.'
+    )
+    assert not worker.is_allocated('kids', 1), (
+        'Проход пула не должен отмечать пожертвования других пулов.'
+    )
+
+
+@pytest.mark.parametrize('name, value', [
+    ('INVEST_MODE', 'windowed'),
+    ('INVEST_STRATEGY', 'closet'),
+])
+def test_invalid_invest_settings(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+    with pytest.raises(ValidationError):
+        Settings()
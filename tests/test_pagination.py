@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest.fixture
+def many_donations(mixer):
+    # Пары пожертвований с одинаковой датой создания - порядок по id
+    for number in range(7):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1,
+            full_amount=number + 1,
+            create_date=datetime(2011, 11, 1 + number // 2),
+        )
+
+
+def collect_pages(client, url, limit):
+    pages = []
+    params = {'limit': limit}
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append([donation['id'] for donation in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        params['cursor'] = cursor
+
+
+def test_donations_keyset_pages(superuser_client, many_donations):
+    pages = collect_pages(superuser_client, '/donation/', 3)
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]], (
+        'Страницы должны идти в порядке (create_date, id) без пропусков '
+        'и повторов.'
+    )
+
+
+def test_pages_without_limit(superuser_client, many_donations):
+    response = superuser_client.get('/donation/')
+    assert len(response.json()) == 7, (
+        'Без параметров должна возвращаться первая страница размера '
+        'по умолчанию.'
+    )
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_exact_last_page(superuser_client, many_donations):
+    pages = collect_pages(superuser_client, '/donation/', 7)
+    assert pages == [[1, 2, 3, 4, 5, 6, 7]], (
+        'Курсор не должен выдаваться, если следующая страница пуста.'
+    )
+
+
+@pytest.mark.parametrize('params', [
+    {'cursor': 'not-a-cursor'},
+    {'cursor': 'WzFd'},
+    {'limit': 0},
+    {'limit': 100000},
+])
+def test_invalid_page(superuser_client, params):
+    response = superuser_client.get('/charity_project/', params=params)
+    assert response.status_code in (400, 422), (
+        'Некорректные параметры страницы должны отклоняться.'
+    )
@@ -0,0 +1,60 @@
+from conftest import engine
+from sqlalchemy import event
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+
+
+def test_sparse_fields(superuser_client, charity_project,
+                       charity_project_nunchaku):
+    response = superuser_client.get(
+        '/charity_project/',
+        params={'fields': 'id,invested_amount', 'limit': 1},
+    )
+    assert response.status_code == 200
+    assert response.json() == [{'id': 1, 'invested_amount': 0}], (
+        'Ответ должен содержать только поля из параметра fields.'
+    )
+    assert NEXT_CURSOR_HEADER in response.headers, (
+        'Суженный ответ должен сохранять курсор следующей страницы.'
+    )
+
+
+def test_sparse_fields_skip_none(superuser_client, donation):
+    response = superuser_client.get(
+        '/donation/', params={'fields': 'id,comment,pool'}
+    )
+    assert response.json() == [{'id': 1, 'comment': 'To you for chimichangas'}]
+
+
+def test_unknown_fields(superuser_client, charity_project):
+    for fields in ('id,version', 'priority', ','):
+        response = superuser_client.get(
+            '/charity_project/', params={'fields': fields}
+        )
+        assert response.status_code == 422, (
+            'Поля вне схемы ответа должны отклоняться.'
+        )
+
+
+def test_select_only_needed_columns(superuser_client, charity_project):
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        if 'FROM charityproject' in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    try:
+        superuser_client.get(
+            '/charity_project/', params={'fields': 'id,invested_amount'}
+        )
+        superuser_client.get('/charity_project/')
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+    sparse, full = statements
+    assert 'description' not in sparse and 'version' not in sparse, (
+        'Запрос должен выбирать только запрошенные столбцы.'
+    )
+    assert 'description' in full and 'version' not in full, (
+        'Запрос списка должен выбирать только столбцы схемы ответа.'
+    )
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.api.streaming import NDJSON
+from app.core.config import settings
+
+
+@pytest.fixture
+def many_donations(mixer):
+    for number in range(5):
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=1 + number % 2,
+            full_amount=number + 1,
+            create_date=datetime(2011, 11, 1 + number),
+        )
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, 'stream_chunk_size', 2)
+
+
+def read_ndjson(response):
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith(NDJSON), (
+        'Поток должен отдаваться с типом application/x-ndjson.'
+    )
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_donations(superuser_client, many_donations, small_chunks):
+    listing = superuser_client.get('/donation/').json()
+    response = superuser_client.get(
+        '/donation/', params={'limit': 1}, headers={'Accept': NDJSON}
+    )
+    assert read_ndjson(response) == listing, (
+        'Поток должен содержать весь список пожертвований в том же '
+        'представлении, что и JSON-ответ, независимо от размера страницы.'
+    )
+    assert len(listing) == 5
+
+
+def test_stream_my_donations(user_client, many_donations, small_chunks):
+    response = user_client.get('/donation/my', headers={'Accept': NDJSON})
+    donations = read_ndjson(response)
+    assert [donation['id'] for donation in donations] == [2, 4], (
+        'Поток пожертвований пользователя должен содержать только его '
+        'пожертвования.'
+    )
+    assert 'user_id' not in donations[0]
+
+
+def test_stream_projects(superuser_client, charity_project):
+    listing = superuser_client.get('/charity_project/').json()
+    response = superuser_client.get(
+        '/charity_project/', headers={'Accept': NDJSON}
+    )
+    assert read_ndjson(response) == listing
@@ -0,0 +1,129 @@
+import pytest
+from conftest import TestingSessionLocal, engine
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from app.api.utils import check_project_before_update, invest_it
+from app.crud.charity_projects import crud_charity_projects
+from app.models import CharityProject
+from app.schemas.charity_projects import ProjectUpdate
+
+PROJECT = {
+    'name': 'chimichangas4life',
+    'description': 'Huge fan of chimichangas. Wanna buy a lot',
+    'full_amount': 1000,
+}
+
+
+@pytest.fixture
+def statements():
+    collected = []
+
+    def collect(conn, cursor, statement, *args):
+        collected.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    yield collected
+    event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+
+
+def project_selects(statements):
+    return [
+        statement for statement in statements
+        if statement.startswith('SELECT') and 'FROM charityproject' in statement
+    ]
+
+
+async def test_create_project_without_reads(superuser_client, donation,
+                                            another_donation, statements):
+    response = superuser_client.post('/charity_project/', json=PROJECT)
+    assert response.status_code == 200
+    assert not [
+        statement for statement in project_selects(statements)
+        if 'charityproject.name' in statement.split('WHERE')[-1] or (
+            'charityproject.id = ?' in statement
+        )
+    ], (
+        'Создание проекта не должно проверять имя и перечитывать проект '
+        'отдельными запросами.'
+    )
+    async with TestingSessionLocal() as session:
+        project = await session.scalar(select(CharityProject))
+    data = response.json()
+    assert data['invested_amount'] == project.invested_amount == 1000, (
+        'Состояние проекта в ответе должно совпадать с записанным '
+        'распределением.'
+    )
+    assert data['fully_invested'] is True
+    assert data['close_date'] == project.close_date.isoformat()
+
+
+def test_update_project_without_reread(superuser_client, charity_project,
+                                       statements):
+    response = superuser_client.patch(
+        '/charity_project/1', json={'full_amount': 5000}
+    )
+    assert response.json()['full_amount'] == 5000
+    update = next(
+        index for index, statement in enumerate(statements)
+        if statement.startswith('UPDATE charityproject')
+    )
+    assert not project_selects(statements[update:]), (
+        'После UPDATE проект не должен перечитываться.'
+    )
+
+
+def test_update_project_single_lookup(superuser_client, charity_project,
+                                      statements):
+    response = superuser_client.patch(
+        '/charity_project/1', json={'full_amount': 5000}
+    )
+    assert response.status_code == 200
+    assert len([
+        statement for statement in project_selects(statements)
+        if 'charityproject.id = ?' in statement
+    ]) == 1, 'Проект должен загружаться по id один раз за запрос.'
+
+
+@pytest.mark.parametrize('url, json', [
+    ('/charity_project/', PROJECT),
+    ('/charity_project/bulk', [PROJECT]),
+])
+def test_name_conflict_from_constraint(superuser_client, url, json):
+    superuser_client.post('/charity_project/', json=PROJECT)
+    response = superuser_client.post(url, json=json)
+    assert response.status_code == 400, (
+        'Нарушение уникальности имени должно возвращать статус-код 400.'
+    )
+    response = superuser_client.patch(
+        '/charity_project/1', json={'description': 'Still writable'}
+    )
+    assert response.status_code == 200, (
+        'Отказ по ограничению не должен затрагивать записанный проект.'
+    )
+
+
+@pytest.mark.parametrize('write', [
+    lambda project, session: crud_charity_projects.update(
+        project, ProjectUpdate(description='Changed'), session
+    ),
+    lambda project, session: crud_charity_projects.remove(project, session),
+], ids=['update', 'remove'])
+async def test_stale_write_conflict(charity_project, donation, write):
+    async with TestingSessionLocal() as session:
+        project = await check_project_before_update(
+            1, ProjectUpdate(description='Changed'), session
+        )
+        async with TestingSessionLocal() as other_session:
+            await invest_it(other_session)
+        with pytest.raises(HTTPException) as error:
+            await write(project, session)
+    assert error.value.status_code == 409, (
+        'Запись проекта, изменённого после загрузки, должна возвращать '
+        'статус-код 409.'
+    )
+    async with TestingSessionLocal() as session:
+        project = await session.get(CharityProject, 1)
+    assert project.invested_amount == 100, (
+        'Отклонённая запись не должна затирать распределение.'
+    )